@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.conf import settings
+
+        from core import metrics
+        from core.db import connection_stats
+
+        metrics.registry.register_stats(
+            'db_connections', connection_stats.stats,
+            ['opened', 'closed', 'health_check_failures'],
+        )
+        if settings.METRICS_ENABLED:
+            metrics.instrument_serializers()
@@ -0,0 +1,128 @@
+"""
+ASGI handler that serves read requests from a bounded thread pool
+
+Django 3.2 runs every sync view and middleware of an ASGI request in one
+shared thread, so slow queries still queue behind each other. Reads under
+ASGI_READ_PATHS instead go through a plain sync handler on a pool of
+ASGI_READ_THREADS threads, each holding its own database connection;
+everything else takes the default path.
+
+Django also iterates streaming responses in the event loop, where a
+generator that queries the database fails. Their content is produced on
+the pool instead, one part ahead of the client.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.base import BaseHandler
+from django.db import close_old_connections
+
+from core.db import check_connection_health, record_connections_closed
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReadOffloadASGIHandler(ASGIHandler):
+    """ASGIHandler that offloads read requests to a thread pool."""
+
+    def __init__(self):
+        super().__init__()
+        self.sync_handler = BaseHandler()
+        self.sync_handler.load_middleware()
+        self.read_paths = tuple(settings.ASGI_READ_PATHS)
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.ASGI_READ_THREADS,
+            thread_name_prefix='asgi-read',
+        )
+
+    def is_offloaded(self, request):
+        return (
+            request.method in READ_METHODS and
+            request.path.startswith(self.read_paths)
+        )
+
+    async def get_response_async(self, request):
+        if not self.is_offloaded(request):
+            return await super().get_response_async(request)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, self.get_response_offloaded, request
+        )
+
+    def get_response_offloaded(self, request):
+        """Run the sync handler, recycling this thread's connection."""
+        close_old_connections()
+        check_connection_health()
+        try:
+            return self.sync_handler.get_response(request)
+        finally:
+            close_old_connections()
+            record_connections_closed()
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        headers = [
+            (header.encode('ascii'), value.encode('latin1'))
+            for header, value in response.items()
+        ]
+        headers += [
+            (b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+            for cookie in response.cookies.values()
+        ]
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': headers,
+        })
+
+        loop = asyncio.get_running_loop()
+        parts = asyncio.Queue(maxsize=1)
+        stopped = threading.Event()
+        done = object()
+
+        def put(part):
+            asyncio.run_coroutine_threadsafe(parts.put(part), loop).result()
+
+        def produce():
+            # one thread for the whole iteration: the generator's cursor
+            # belongs to this thread's connection
+            close_old_connections()
+            try:
+                for part in response:
+                    if stopped.is_set():
+                        break
+                    put(part)
+            finally:
+                close_old_connections()
+                record_connections_closed()
+                put(done)
+
+        producer = loop.run_in_executor(self.executor, produce)
+        try:
+            while True:
+                part = await parts.get()
+                if part is done:
+                    break
+                for chunk, _ in self.chunk_bytes(part):
+                    await send({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+        finally:
+            # unblock the producer if the client went away
+            stopped.set()
+            while not producer.done():
+                if not parts.empty():
+                    parts.get_nowait()
+                await asyncio.wait([producer], timeout=0.05)
+        await producer
+        await send({'type': 'http.response.body'})
+        await sync_to_async(response.close, thread_sensitive=True)()
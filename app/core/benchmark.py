@@ -0,0 +1,268 @@
+"""
+Benchmark data and scenarios for the recipe API
+
+`seed_user_recipes` bulk-inserts a reproducible data set: recipe n of a
+user always gets the same title, time, price, tags and ingredients. The
+scenarios drive the API in-process through the test client, so a run
+measures views, serializers and SQL without a web server in between.
+"""
+import io
+import time
+from collections import OrderedDict
+from decimal import Decimal
+
+from PIL import Image
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.search import update_search_vectors
+
+BATCH_SIZE = 10000
+TAG_NAMES = [f'tag {i}' for i in range(50)]
+INGREDIENT_NAMES = [f'ingredient {i}' for i in range(200)]
+TAGS_PER_RECIPE = 2
+INGREDIENTS_PER_RECIPE = 5
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of sorted samples."""
+    if not samples:
+        return 0.0
+    index = max(0, int(round(pct / 100 * len(samples))) - 1)
+    return samples[min(index, len(samples) - 1)]
+
+
+def _spread(ids, n, count):
+    # `count` ids picked deterministically by recipe number
+    start = n * count % len(ids)
+    return (ids[start:] + ids[:start])[:count]
+
+
+def seed_user_recipes(user, total, tags=len(TAG_NAMES),
+                      ingredients=len(INGREDIENT_NAMES), log=None):
+    """Bring `user` up to `total` recipes, with tags and ingredients."""
+    Tag.objects.bulk_create([
+        Tag(user=user, name=name) for name in TAG_NAMES[:tags]
+    ], ignore_conflicts=True)
+    Ingredient.objects.bulk_create([
+        Ingredient(user=user, name=name)
+        for name in INGREDIENT_NAMES[:ingredients]
+    ], ignore_conflicts=True)
+    tag_ids = list(
+        Tag.objects.filter(user=user).order_by('id')
+        .values_list('id', flat=True)
+    )
+    ingredient_ids = list(
+        Ingredient.objects.filter(user=user).order_by('id')
+        .values_list('id', flat=True)
+    )
+    tag_through = Recipe.tags.through
+    ingredient_through = Recipe.ingredients.through
+
+    existing = Recipe.objects.filter(user=user).count()
+    seeded = existing
+    while existing < total:
+        size = min(BATCH_SIZE, total - existing)
+        last_id = Recipe.objects.order_by('-id').values_list(
+            'id', flat=True,
+        ).first() or 0
+        Recipe.objects.bulk_create([
+            Recipe(
+                user=user,
+                title=f'Recipe {n}',
+                time_minutes=5 + n % 120,
+                price=Decimal(n % 10000) / 100,
+                description=f'Benchmark recipe number {n}.',
+            )
+            for n in range(existing, existing + size)
+        ])
+        new_ids = list(Recipe.objects.filter(
+            user=user, id__gt=last_id,
+        ).order_by('id').values_list('id', flat=True))
+        if tag_ids:
+            tag_through.objects.bulk_create([
+                tag_through(recipe_id=recipe_id, tag_id=tag_id)
+                for n, recipe_id in enumerate(new_ids, existing)
+                for tag_id in _spread(tag_ids, n, TAGS_PER_RECIPE)
+            ])
+        if ingredient_ids:
+            ingredient_through.objects.bulk_create([
+                ingredient_through(
+                    recipe_id=recipe_id, ingredient_id=ingredient_id,
+                )
+                for n, recipe_id in enumerate(new_ids, existing)
+                for ingredient_id in _spread(
+                    ingredient_ids, n, INGREDIENTS_PER_RECIPE,
+                )
+            ])
+        update_search_vectors(new_ids)
+        existing += size
+        if log:
+            log(f'Seeded {existing}/{total} recipes for {user.email}')
+
+    if existing > seeded:
+        user.bump_recipes_version()
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'ANALYZE core_recipe, core_tag, core_ingredient, '
+                    'core_recipe_tags, core_recipe_ingredients'
+                )
+
+
+def _image_upload():
+    buffer = io.BytesIO()
+    Image.new('RGB', (1200, 900), (200, 120, 40)).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+class Scenarios:
+    """The scripted API calls, each a callable of the iteration number.
+
+    Recipes made by the create and upload scenarios are removed by
+    `cleanup()`.
+    """
+
+    def __init__(self, client, user):
+        self.client = client
+        self.user = user
+        self.created = []
+        self.recipe_ids = list(
+            Recipe.objects.filter(user=user).order_by('-id')
+            .values_list('id', flat=True)[:100]
+        )
+        self.tag_ids = list(
+            Tag.objects.filter(user=user).order_by('id')
+            .values_list('id', flat=True)[:2]
+        )
+        self.image = _image_upload()
+        self.upload_recipe = None
+
+    def all(self):
+        return OrderedDict([
+            ('list', self.list),
+            ('filtered_list', self.filtered_list),
+            ('detail', self.detail),
+            ('create', self.create),
+            ('image_upload', self.image_upload),
+        ])
+
+    def list(self, i):
+        return self.client.get(reverse('recipe:recipe-list'))
+
+    def filtered_list(self, i):
+        return self.client.get(reverse('recipe:recipe-list'), {
+            'tags': ','.join(str(tag_id) for tag_id in self.tag_ids),
+            'max_time': 60,
+            'ordering': 'time_minutes',
+        })
+
+    def detail(self, i):
+        recipe_id = self.recipe_ids[i % len(self.recipe_ids)]
+        return self.client.get(
+            reverse('recipe:recipe-detail', args=[recipe_id])
+        )
+
+    def create(self, i):
+        res = self.client.post(reverse('recipe:recipe-list'), {
+            'title': f'Benchmark create {i}',
+            'time_minutes': 10 + i % 50,
+            'price': '7.50',
+            'tags': [{'name': TAG_NAMES[0]}, {'name': f'bench tag {i % 5}'}],
+            'ingredients': [
+                {'name': name} for name in INGREDIENT_NAMES[:3]
+            ],
+        }, format='json')
+        if res.status_code == 201:
+            self.created.append(res.data['id'])
+        return res
+
+    def image_upload(self, i):
+        if self.upload_recipe is None:
+            self.upload_recipe = Recipe.objects.create(
+                user=self.user, title='Benchmark upload',
+                time_minutes=5, price=Decimal('1.00'),
+            )
+            self.created.append(self.upload_recipe.id)
+        url = reverse(
+            'recipe:recipe-upload-image', args=[self.upload_recipe.id],
+        )
+        return self.client.post(
+            url,
+            {'image': SimpleUploadedFile(
+                'bench.jpg', self.image, content_type='image/jpeg',
+            )},
+            format='multipart',
+        )
+
+    def cleanup(self):
+        if self.created:
+            Recipe.objects.filter(id__in=self.created).delete()
+            Tag.objects.filter(
+                user=self.user, name__startswith='bench tag',
+            ).delete()
+            self.user.bump_recipes_version()
+
+
+def run_scenario(request, count, warmup=0):
+    """Call `request` and summarize latency, throughput and query counts."""
+    for i in range(warmup):
+        request(i)
+
+    latencies = []
+    queries = 0
+    errors = 0
+    start = time.perf_counter()
+    for i in range(warmup, warmup + count):
+        with CaptureQueriesContext(connection) as ctx:
+            began = time.perf_counter()
+            response = request(i)
+            latencies.append(time.perf_counter() - began)
+        queries += len(ctx.captured_queries)
+        if response.status_code >= 400:
+            errors += 1
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests': count,
+        'errors': errors,
+        'throughput': count / wall if wall else 0.0,
+        'mean_ms': sum(latencies) / count * 1000,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'queries': queries / count,
+    }
+
+
+def compare_results(baseline, current, threshold):
+    """(scenario, message, regressed) for scenarios in both runs.
+
+    A scenario regresses when its p95 grows by more than `threshold`
+    percent or it issues more queries per request.
+    """
+    rows = []
+    for name, result in current['scenarios'].items():
+        base = baseline['scenarios'].get(name)
+        if base is None:
+            continue
+        p95_change = (
+            (result['p95_ms'] - base['p95_ms']) / base['p95_ms'] * 100
+            if base['p95_ms'] else 0.0
+        )
+        regressed = (
+            p95_change > threshold or result['queries'] > base['queries']
+        )
+        rows.append((
+            name,
+            f'p95 {base["p95_ms"]:.1f} -> {result["p95_ms"]:.1f} ms '
+            f'({p95_change:+.0f}%), queries {base["queries"]:g} -> '
+            f'{result["queries"]:g}',
+            regressed,
+        ))
+    return rows
@@ -0,0 +1,93 @@
+"""
+Persistent connection health checks and connection instrumentation
+
+"""
+import threading
+import time
+
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+class ConnectionStats:
+    """Per-process count and lifetime of database connections."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.opened = 0
+            self.closed = 0
+            self.health_check_failures = 0
+            self.lifetime_total = 0.0
+            self.lifetime_max = 0.0
+
+    def connection_opened(self, wrapper):
+        wrapper.stats_opened_at = time.monotonic()
+        with self.lock:
+            self.opened += 1
+
+    def connection_closed(self, wrapper):
+        opened_at = getattr(wrapper, 'stats_opened_at', None)
+        if opened_at is None:
+            return
+        wrapper.stats_opened_at = None
+        lifetime = time.monotonic() - opened_at
+        with self.lock:
+            self.closed += 1
+            self.lifetime_total += lifetime
+            self.lifetime_max = max(self.lifetime_max, lifetime)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'opened': self.opened,
+                'closed': self.closed,
+                'open': self.opened - self.closed,
+                'health_check_failures': self.health_check_failures,
+                'lifetime_avg': (
+                    self.lifetime_total / self.closed if self.closed else 0.0
+                ),
+                'lifetime_max': self.lifetime_max,
+            }
+
+
+connection_stats = ConnectionStats()
+
+
+def record_connection_created(sender, connection, **kwargs):
+    connection_stats.connection_opened(connection)
+
+
+def check_connection_health(**kwargs):
+    """Drop reused connections that the server has closed under us.
+
+    Runs after Django's close_old_connections, so only connections that
+    survived CONN_MAX_AGE are checked, once per request.
+    """
+    for conn in connections.all():
+        if conn.connection is None:
+            connection_stats.connection_closed(conn)
+            continue
+        if not conn.settings_dict.get('CONN_HEALTH_CHECKS'):
+            continue
+        if conn.in_atomic_block or conn.is_usable():
+            continue
+        with connection_stats.lock:
+            connection_stats.health_check_failures += 1
+        conn.close()
+        connection_stats.connection_closed(conn)
+
+
+def record_connections_closed(**kwargs):
+    for conn in connections.all():
+        if conn.connection is None:
+            connection_stats.connection_closed(conn)
+
+
+connection_created.connect(record_connection_created)
+request_started.connect(check_connection_health)
+request_finished.connect(record_connections_closed)
@@ -0,0 +1,76 @@
+"""
+Django command to compare the JSON renderers on large recipe lists
+
+"""
+import time
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from core.renderers import ORJSONRenderer
+
+
+def recipe_payload(count):
+    """A paginated recipe list shaped like the list endpoint's output."""
+    results = [
+        OrderedDict([
+            ('id', i),
+            ('title', f'Recipe number {i}'),
+            ('time_minutes', 5 + i % 120),
+            ('price', Decimal(i % 10000) / 100),
+            ('link', f'https://example.com/recipes/{i}.pdf'),
+            ('tags', [
+                OrderedDict([('id', i * 3 + j), ('name', f'tag {j}')])
+                for j in range(3)
+            ]),
+            ('ingredients', [
+                OrderedDict([('id', i * 8 + j), ('name', f'ingredient {j}')])
+                for j in range(8)
+            ]),
+        ])
+        for i in range(count)
+    ]
+    return OrderedDict([
+        ('next', 'http://localhost/api/recipe/recipes/?cursor=cD0xMjM0'),
+        ('previous', None),
+        ('results', results),
+    ])
+
+
+class Command(BaseCommand):
+    help = 'Time JSONRenderer against ORJSONRenderer on recipe lists.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=500)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        data = recipe_payload(options['count'])
+        renderers = {
+            'JSONRenderer': JSONRenderer(),
+            'ORJSONRenderer': ORJSONRenderer(),
+        }
+
+        outputs = {}
+        timings = {}
+        for name, renderer in renderers.items():
+            start = time.perf_counter()
+            for _ in range(options['repeat']):
+                outputs[name] = renderer.render(data)
+            timings[name] = (time.perf_counter() - start) / options['repeat']
+
+        if len(set(outputs.values())) != 1:
+            raise CommandError('Renderers produced different output')
+
+        baseline = timings['JSONRenderer']
+        for name, elapsed in timings.items():
+            self.stdout.write(
+                f'{name:<16} {elapsed * 1000:8.2f} ms/render '
+                f'{baseline / elapsed:6.1f}x'
+            )
+        self.stdout.write(
+            f'{options["count"]} recipes, '
+            f'{len(outputs["JSONRenderer"])} bytes per response'
+        )
@@ -0,0 +1,141 @@
+"""
+Django command to benchmark the recipe API in-process
+
+Seed data first, then save a baseline and compare later runs against it:
+
+    python manage.py seed_recipes --users 2 --recipes 5000
+    python manage.py benchmark_recipes --output baseline.json
+    python manage.py benchmark_recipes --compare baseline.json
+"""
+import json
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.benchmark import Scenarios, compare_results, run_scenario
+from core.models import Recipe
+from recipe.images import image_worker
+
+SCENARIOS = ['list', 'filtered_list', 'detail', 'create', 'image_upload']
+
+
+class Command(BaseCommand):
+    help = (
+        'Run scripted recipe API scenarios through the test client and '
+        'report latency percentiles, throughput and queries per request.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', default='bench0@example.com')
+        parser.add_argument(
+            '--scenario', action='append', choices=SCENARIOS,
+            help='Run only this scenario; may be repeated.',
+        )
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument(
+            '--no-list-cache', action='store_true',
+            help='Measure list requests without the recipe list cache.',
+        )
+        parser.add_argument('--output', help='Write the results as JSON.')
+        parser.add_argument(
+            '--compare', help='Baseline JSON to compare the results with.',
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=10,
+            help='Allowed p95 growth against the baseline, in percent.',
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['warmup'] < 0:
+            raise CommandError('--requests must be >= 1 and --warmup >= 0')
+        user = get_user_model().objects.filter(email=options['email']).first()
+        if user is None:
+            raise CommandError(
+                f'No user {options["email"]}; run seed_recipes first'
+            )
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as baseline_file:
+                baseline = json.load(baseline_file)
+
+        token, _ = Token.objects.get_or_create(user=user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        media_root = tempfile.mkdtemp()
+        overrides = {
+            'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver'],
+            'MEDIA_ROOT': media_root,
+        }
+        if options['no_list_cache']:
+            overrides['RECIPE_LIST_CACHE_ENABLED'] = False
+
+        scenarios = Scenarios(client, user)
+        if not scenarios.recipe_ids:
+            raise CommandError(f'{user.email} has no recipes to benchmark')
+        results = {}
+        try:
+            with override_settings(**overrides):
+                for name, request in scenarios.all().items():
+                    if options['scenario'] and \
+                            name not in options['scenario']:
+                        continue
+                    results[name] = run_scenario(
+                        request, options['requests'], options['warmup'],
+                    )
+                    self.report(name, results[name])
+        finally:
+            image_worker.drain()
+            scenarios.cleanup()
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        run = {
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'user': user.email,
+            'recipes': Recipe.objects.filter(user=user).count(),
+            'list_cache': not options['no_list_cache'],
+            'scenarios': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(run, output, indent=2)
+            self.stdout.write(f'Results written to {options["output"]}')
+
+        if baseline is not None:
+            self.compare(baseline, run, options['threshold'])
+
+    def report(self, name, result):
+        self.stdout.write(self.style.MIGRATE_HEADING(name))
+        self.stdout.write(
+            f'  {result["throughput"]:8.1f} req/s  '
+            f'p50 {result["p50_ms"]:.1f} ms  p95 {result["p95_ms"]:.1f} ms  '
+            f'p99 {result["p99_ms"]:.1f} ms  '
+            f'{result["queries"]:g} queries/request'
+        )
+        if result['errors']:
+            self.stdout.write(self.style.ERROR(
+                f'  {result["errors"]} of {result["requests"]} requests failed'
+            ))
+
+    def compare(self, baseline, run, threshold):
+        regressions = []
+        for name, message, regressed in compare_results(
+            baseline, run, threshold,
+        ):
+            if regressed:
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(f'{name}: {message}'))
+            else:
+                self.stdout.write(f'{name}: {message}')
+        if regressions:
+            raise CommandError(f'Regressed: {", ".join(regressions)}')
@@ -0,0 +1,72 @@
+"""
+Django command to print the query plans behind the recipe API
+
+Compare the plans with and without the indexes from core 0008:
+
+    python manage.py explain_recipe_queries --seed 1000000
+    python manage.py migrate core 0007
+    python manage.py explain_recipe_queries
+    python manage.py migrate core
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Exists
+
+from core.benchmark import TAG_NAMES, seed_user_recipes
+from core.models import Recipe, Tag
+from recipe.serializers import recipe_links
+
+
+class Command(BaseCommand):
+    help = 'Print EXPLAIN output for the queries issued by the recipe API.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Make sure the benchmark user owns this many recipes.',
+        )
+        parser.add_argument(
+            '--email', default='bench@example.com',
+            help='Benchmark user whose data is queried.',
+        )
+
+    def handle(self, *args, **options):
+        user, _ = get_user_model().objects.get_or_create(
+            email=options['email'],
+        )
+        if options['seed']:
+            seed_user_recipes(user, options['seed'], log=self.stdout.write)
+
+        newest = Recipe.objects.filter(user=user).order_by('-id')
+        middle = newest.values_list('id', flat=True)[
+            newest.count() // 2:newest.count() // 2 + 1
+        ].first() or 0
+        queries = {
+            'recipe list, first page': newest[:100],
+            'recipe list, deep page': newest.filter(id__lt=middle)[:100],
+            'quick meals, fastest first': newest.filter(
+                time_minutes__lte=20,
+            ).order_by('time_minutes', 'id')[:100],
+            'tag lookup by name': Tag.objects.filter(
+                user=user, name__in=TAG_NAMES[:5],
+            ),
+            # as the tag list sends it for ?assigned_only=1
+            'assigned tags': Tag.objects.filter(
+                Exists(recipe_links('tags')), user=user,
+            ).order_by('-id'),
+        }
+
+        analyze = {'analyze': True} if connection.vendor == 'postgresql' \
+            else {}
+        for title, queryset in queries.items():
+            start = time.perf_counter()
+            plan = queryset.explain(**analyze)
+            elapsed = (time.perf_counter() - start) * 1000
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{title} ({elapsed:.1f} ms)'
+            ))
+            self.stdout.write(plan)
+            self.stdout.write('')
@@ -0,0 +1,155 @@
+"""
+Django command to bulk load recipes from a JSONL or CSV file
+
+Each line of a JSONL file is an object like
+
+    {"user": "chef@example.com", "title": "Soup", "time_minutes": 20,
+     "price": "4.50", "tags": ["vegan"], "ingredients": ["leek", "potato"]}
+
+CSV files have the same columns, with names in `tags` and `ingredients`
+separated by `|`. `user` may be left out when --user is given.
+
+After every committed chunk the last row number is saved to the
+checkpoint file, and a re-run resumes after it. A crash between a commit
+and the checkpoint write replays that one chunk.
+"""
+import json
+import os
+import tempfile
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from recipe.importer import FORMATS, RecipeLoader, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Load recipes, with their tags and ingredients, from a file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='File format; guessed from the extension by default.',
+        )
+        parser.add_argument(
+            '--user', help='Email of the owner of rows without a user.',
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument(
+            '--copy', action='store_true',
+            help='Write with COPY instead of INSERT (Postgres only).',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Progress file; defaults to <path>.checkpoint.',
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Ignore an existing checkpoint and load from the start.',
+        )
+        parser.add_argument(
+            '--errors', help='Write rejected rows to this JSONL file.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or os.path.splitext(path)[1][1:]
+        if file_format not in FORMATS:
+            raise CommandError(
+                f'Cannot tell the format of {path}; pass --format'
+            )
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be >= 1')
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('--copy needs a Postgres database')
+
+        default_user = None
+        if options['user']:
+            default_user = get_user_model().objects.filter(
+                email=options['user'],
+            ).first()
+            if default_user is None:
+                raise CommandError(f'No user {options["user"]}')
+
+        checkpoint_path = options['checkpoint'] or f'{path}.checkpoint'
+        checkpoint = self.read_checkpoint(checkpoint_path, path, options)
+        if checkpoint['row']:
+            self.stdout.write(f'Resuming after row {checkpoint["row"]}')
+
+        loader = RecipeLoader(default_user, use_copy=options['copy'])
+        errors = open(options['errors'], 'a') if options['errors'] else None
+        start = time.perf_counter()
+        read = 0
+        try:
+            with open(path, newline='', encoding='utf-8') as source:
+                rows = (
+                    (number, row)
+                    for number, row in read_rows(source, file_format)
+                    if number > checkpoint['row']
+                )
+                while True:
+                    chunk = list(islice(rows, options['chunk_size']))
+                    if not chunk:
+                        break
+                    loaded, rejected = loader.load_chunk(chunk)
+                    read += len(chunk)
+                    checkpoint['row'] = chunk[-1][0]
+                    checkpoint['loaded'] += loaded
+                    checkpoint['rejected'] += len(rejected)
+                    self.write_checkpoint(checkpoint_path, checkpoint)
+                    self.report_rejected(rejected, errors)
+
+                    elapsed = time.perf_counter() - start
+                    self.stdout.write(
+                        f'Row {checkpoint["row"]}: '
+                        f'{checkpoint["loaded"]} loaded, '
+                        f'{checkpoint["rejected"]} rejected, '
+                        f'{read / elapsed:.0f} rows/s'
+                    )
+        finally:
+            if errors:
+                errors.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Loaded {checkpoint["loaded"]} recipes from {path} '
+            f'({checkpoint["rejected"]} rejected)'
+        ))
+
+    def read_checkpoint(self, checkpoint_path, path, options):
+        fresh = {
+            'path': os.path.abspath(path),
+            'size': os.path.getsize(path),
+            'row': 0,
+            'loaded': 0,
+            'rejected': 0,
+        }
+        if options['restart'] or not os.path.exists(checkpoint_path):
+            return fresh
+        with open(checkpoint_path) as checkpoint_file:
+            checkpoint = json.load(checkpoint_file)
+        if checkpoint.get('size') != fresh['size']:
+            raise CommandError(
+                f'{path} changed since {checkpoint_path} was written; '
+                'pass --restart to load it from the start'
+            )
+        return checkpoint
+
+    def write_checkpoint(self, checkpoint_path, checkpoint):
+        directory = os.path.dirname(os.path.abspath(checkpoint_path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as checkpoint_file:
+            json.dump(checkpoint, checkpoint_file)
+        os.replace(temp_path, checkpoint_path)
+
+    def report_rejected(self, rejected, errors):
+        for number, row_errors in rejected:
+            if errors:
+                errors.write(json.dumps({
+                    'row': number, 'errors': row_errors,
+                }) + '\n')
+            else:
+                self.stderr.write(f'Row {number} rejected: {row_errors}')
@@ -0,0 +1,92 @@
+"""
+Django command to load test a running server with concurrent clients
+
+"""
+import threading
+import time
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        'Fire concurrent GET requests at one or more URLs and report '
+        'throughput and latency percentiles. Run it once against the '
+        'uwsgi server and once with SERVER_MODE=asgi to compare.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--requests', type=int, default=400)
+        parser.add_argument('--token', help='API token for the requests.')
+        parser.add_argument('--timeout', type=float, default=30)
+
+    def run(self, url, options):
+        headers = {'Accept': 'application/json'}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+
+        remaining = iter(range(options['requests']))
+        lock = threading.Lock()
+        latencies = []
+        errors = []
+
+        def worker():
+            while True:
+                with lock:
+                    if next(remaining, None) is None:
+                        return
+                start = time.perf_counter()
+                try:
+                    with urlopen(
+                        Request(url, headers=headers),
+                        timeout=options['timeout'],
+                    ) as response:
+                        response.read()
+                except (HTTPError, URLError, OSError) as exc:
+                    with lock:
+                        errors.append(exc)
+                    continue
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+
+        threads = [
+            threading.Thread(target=worker)
+            for _ in range(options['concurrency'])
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+
+        latencies.sort()
+        return latencies, errors, wall
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError('--concurrency and --requests must be >= 1')
+
+        for url in options['urls']:
+            latencies, errors, wall = self.run(url, options)
+            self.stdout.write(url)
+            self.stdout.write(
+                f'  {len(latencies)} ok, {len(errors)} errors, '
+                f'{options["concurrency"]} clients, {wall:.2f} s'
+            )
+            self.stdout.write(
+                f'  {len(latencies) / wall:8.1f} req/s  '
+                + '  '.join(
+                    f'p{pct} {percentile(latencies, pct) * 1000:.1f} ms'
+                    for pct in (50, 95, 99)
+                )
+            )
+            if errors:
+                self.stdout.write(f'  first error: {errors[0]}')
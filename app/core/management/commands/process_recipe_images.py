@@ -0,0 +1,49 @@
+"""
+Django command to render variants of recipe images left unprocessed
+
+"""
+from django.core.management.base import BaseCommand
+
+from core.models import Recipe
+from recipe.images import process_recipe_image
+
+
+class Command(BaseCommand):
+    help = (
+        'Render image variants for recipes still pending, e.g. after a '
+        'restart dropped the background queue.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retry-failed', action='store_true',
+            help='Also retry recipes whose processing failed.',
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Render the missing variants of every recipe image, e.g. '
+                 'after adding a variant.',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='With --all, re-render variants that already exist.',
+        )
+
+    def handle(self, *args, **options):
+        queryset = Recipe.objects.exclude(image='').exclude(image=None)
+        if not options['all']:
+            statuses = ['pending']
+            if options['retry_failed']:
+                statuses.append('failed')
+            queryset = queryset.filter(image_status__in=statuses)
+
+        overwrite = options['force'] or not options['all']
+        counts = {}
+        for recipe_id in queryset.values_list('id', flat=True).iterator():
+            outcome = process_recipe_image(recipe_id, overwrite)
+            counts[outcome] = counts.get(outcome, 0) + 1
+
+        self.stdout.write(
+            f'{counts.get("ready", 0)} ready, '
+            f'{counts.get("failed", 0)} failed'
+        )
@@ -0,0 +1,53 @@
+"""
+Django command to seed benchmark users with recipes, tags and ingredients
+
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark import INGREDIENT_NAMES, TAG_NAMES, seed_user_recipes
+
+
+class Command(BaseCommand):
+    help = (
+        'Create benchmark users bench0@example.com, bench1@example.com, ... '
+        'and bulk-insert recipes for them. Re-running only tops them up.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1)
+        parser.add_argument(
+            '--recipes', type=int, default=1000,
+            help='Recipes per user.',
+        )
+        parser.add_argument(
+            '--tags', type=int, default=len(TAG_NAMES),
+            help=f'Tags per user, at most {len(TAG_NAMES)}.',
+        )
+        parser.add_argument(
+            '--ingredients', type=int, default=len(INGREDIENT_NAMES),
+            help=f'Ingredients per user, at most {len(INGREDIENT_NAMES)}.',
+        )
+        parser.add_argument('--email-prefix', default='bench')
+        parser.add_argument('--password', default='benchpass123')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['recipes'] < 0:
+            raise CommandError('--users must be >= 1 and --recipes >= 0')
+
+        User = get_user_model()
+        for i in range(options['users']):
+            email = f'{options["email_prefix"]}{i}@example.com'
+            user = User.objects.filter(email=email).first()
+            if user is None:
+                user = User.objects.create_user(
+                    email, options['password'], name=f'Benchmark user {i}',
+                )
+            seed_user_recipes(
+                user, options['recipes'],
+                tags=options['tags'], ingredients=options['ingredients'],
+                log=self.stdout.write,
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'{options["users"]} users with {options["recipes"]} recipes each'
+        ))
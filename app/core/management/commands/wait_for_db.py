@@ -2,15 +2,61 @@
 Django command to wait for the database to be available
 
 """
+import threading
 import time
 
 from django.core.management.base import BaseCommand
 from psycopg2 import OperationalError as Psycopg2Error
+from django.db import connections
 from django.db.utils import OperationalError
 
 
 class Command(BaseCommand):
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--warm', type=int, default=0,
+            help='Open this many connections at once once the database '
+                 'is up, so pgbouncer has its server pool ready.',
+        )
+
+    def warm(self, count):
+        barrier = threading.Barrier(count, timeout=30)
+        errors = []
+
+        def open_connection():
+            try:
+                with connections['default'].cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                    barrier.wait()
+            except (Psycopg2Error, OperationalError) as exc:
+                barrier.abort()
+                errors.append(exc)
+            except threading.BrokenBarrierError:
+                pass
+            finally:
+                connections['default'].close()
+
+        threads = [
+            threading.Thread(target=open_connection) for _ in range(count)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            self.stdout.write(self.style.WARNING(
+                f'Warmed {count - len(errors)}/{count} connections: '
+                f'{errors[0]}'
+            ))
+        else:
+            self.stdout.write(
+                f'Warmed {count} connections in '
+                f'{(time.perf_counter() - start) * 1000:.0f} ms'
+            )
+
     def handle(self, *args, **options):
         self.stdout.write("waiting for response")
         db_up = False
@@ -25,3 +71,6 @@ class Command(BaseCommand):
                 time.sleep(1)
 
         self.stdout.write(self.style.SUCCESS('Database available !'))
+
+        if options['warm'] > 0:
+            self.warm(options['warm'])
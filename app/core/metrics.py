@@ -0,0 +1,294 @@
+"""
+Per-request performance metrics
+
+PerformanceMiddleware opens a RequestMetrics for every request; database
+time comes from a connection execute wrapper and serializer time from
+`instrument_serializers()`. Finished requests are folded into the
+process-wide `registry`, which every METRICS_FLUSH_INTERVAL seconds writes
+a snapshot to METRICS_DIR/<pid>.json so that the scrape endpoint can sum
+the snapshots of all uwsgi workers.
+"""
+import contextvars
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# upper bounds of the request duration histogram, in seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b|%s")
+_IN_LIST = re.compile(r'IN \((?:\?, )*\?\)')
+_SAVEPOINT = re.compile(r'"s\d+_x\d+"')
+
+
+def sql_shape(sql):
+    """SQL with literals, IN-list lengths and savepoint ids folded."""
+    sql = _LITERAL.sub('?', _SAVEPOINT.sub('"s?"', sql))
+    return _IN_LIST.sub('IN (...)', sql)
+
+
+class RequestMetrics:
+    """Timings and query shapes of one request."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.view = None
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.shapes = Counter()
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.db_queries += 1
+            self.shapes[sql] += 1
+
+    def repeated_queries(self, threshold):
+        """(count, shape) of query shapes run at least `threshold` times."""
+        shapes = Counter()
+        for sql, count in self.shapes.items():
+            shapes[sql_shape(sql)] += count
+        return [
+            (count, shape) for shape, count in shapes.most_common()
+            if count >= threshold
+        ]
+
+    def server_timing(self, wall):
+        return (
+            f'db;dur={self.db_time * 1000:.1f}'
+            f';desc="{self.db_queries} queries"'
+            f', serialize;dur={self.serializer_time * 1000:.1f}'
+            f', app;dur={wall * 1000:.1f}'
+        )
+
+
+def current_metrics():
+    """RequestMetrics of the request being handled, if any."""
+    return _current.get()
+
+
+def start_request():
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def instrument_serializers():
+    """Time every top-level `serializer.data` into the current request.
+
+    Nested serializers render through `to_representation`, so only the
+    outermost serialization of a response is counted.
+    """
+    from rest_framework.serializers import BaseSerializer
+
+    data = BaseSerializer.data
+    if getattr(data, 'instrumented', False):
+        return
+
+    def timed_data(serializer):
+        metrics = _current.get()
+        if metrics is None:
+            return data.fget(serializer)
+        start = time.perf_counter()
+        try:
+            return data.fget(serializer)
+        finally:
+            metrics.serializer_time += time.perf_counter() - start
+
+    timed = property(timed_data)
+    timed.fget.instrumented = True
+    BaseSerializer.data = timed
+
+
+class MetricsRegistry:
+    """Aggregated request metrics of this process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sources = {}
+        self.last_flush = 0.0
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.views = {}
+            self.statuses = Counter()
+
+    def register_stats(self, name, stats, keys):
+        """Export the counters `keys` of the dict `stats()` returns."""
+        self.sources[name] = (stats, keys)
+
+    def record(self, metrics, status_code, wall, size, n_plus_one):
+        view = metrics.view or 'unresolved'
+        with self.lock:
+            totals = self.views.get(view)
+            if totals is None:
+                totals = self.views[view] = {
+                    'requests': 0,
+                    'duration': 0.0,
+                    'db_queries': 0,
+                    'db_duration': 0.0,
+                    'serializer_duration': 0.0,
+                    'response_bytes': 0,
+                    'n_plus_one': 0,
+                    'buckets': [0] * len(DURATION_BUCKETS),
+                }
+            totals['requests'] += 1
+            totals['duration'] += wall
+            totals['db_queries'] += metrics.db_queries
+            totals['db_duration'] += metrics.db_time
+            totals['serializer_duration'] += metrics.serializer_time
+            totals['response_bytes'] += size
+            totals['n_plus_one'] += n_plus_one
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if wall <= bound:
+                    totals['buckets'][index] += 1
+            self.statuses[f'{view}|{status_code}'] += 1
+
+    def snapshot(self):
+        with self.lock:
+            snapshot = {
+                'views': {
+                    view: dict(totals, buckets=list(totals['buckets']))
+                    for view, totals in self.views.items()
+                },
+                'statuses': dict(self.statuses),
+            }
+        snapshot['sources'] = {
+            name: {key: stats()[key] for key in keys}
+            for name, (stats, keys) in self.sources.items()
+        }
+        return snapshot
+
+    def flush(self, force=False):
+        """Write this process's snapshot to METRICS_DIR, at most so often."""
+        directory = settings.METRICS_DIR
+        now = time.monotonic()
+        interval = settings.METRICS_FLUSH_INTERVAL
+        if not directory or not force and now - self.last_flush < interval:
+            return
+        self.last_flush = now
+        os.makedirs(directory, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as snapshot_file:
+            json.dump(self.snapshot(), snapshot_file)
+        os.replace(path, os.path.join(directory, f'{os.getpid()}.json'))
+
+    def collect(self):
+        """Snapshots of every worker sharing METRICS_DIR, or just this one."""
+        directory = settings.METRICS_DIR
+        if not directory:
+            return [self.snapshot()]
+        self.flush(force=True)
+        snapshots = []
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(directory, name)) as snapshot_file:
+                    snapshots.append(json.load(snapshot_file))
+            except (OSError, ValueError):
+                logger.warning('Skipping unreadable metrics file %s', name)
+        return snapshots
+
+
+registry = MetricsRegistry()
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+def render_prometheus(snapshots):
+    """Prometheus text exposition of the summed snapshots."""
+    views = {}
+    statuses = Counter()
+    sources = {}
+    for snapshot in snapshots:
+        for view, totals in snapshot['views'].items():
+            merged = views.setdefault(view, {
+                key: [0] * len(value) if isinstance(value, list) else 0
+                for key, value in totals.items()
+            })
+            for key, value in totals.items():
+                if isinstance(value, list):
+                    merged[key] = [a + b for a, b in zip(merged[key], value)]
+                else:
+                    merged[key] += value
+        statuses.update(snapshot['statuses'])
+        for name, values in snapshot['sources'].items():
+            merged = sources.setdefault(name, Counter())
+            merged.update(values)
+
+    lines = [
+        '# HELP app_requests_total Requests handled, by view and status.',
+        '# TYPE app_requests_total counter',
+    ]
+    for key, count in sorted(statuses.items()):
+        view, status = key.rsplit('|', 1)
+        lines.append(
+            f'app_requests_total{{view="{_label(view)}",status="{status}"}} '
+            f'{count}'
+        )
+
+    lines += [
+        '# HELP app_request_duration_seconds Wall time of requests.',
+        '# TYPE app_request_duration_seconds histogram',
+    ]
+    for view, totals in sorted(views.items()):
+        label = f'view="{_label(view)}"'
+        for bound, count in zip(DURATION_BUCKETS, totals['buckets']):
+            lines.append(
+                f'app_request_duration_seconds_bucket{{{label},le="{bound}"}} '
+                f'{count}'
+            )
+        lines.append(
+            f'app_request_duration_seconds_bucket{{{label},le="+Inf"}} '
+            f'{totals["requests"]}'
+        )
+        lines.append(
+            f'app_request_duration_seconds_sum{{{label}}} {totals["duration"]}'
+        )
+        lines.append(
+            f'app_request_duration_seconds_count{{{label}}} '
+            f'{totals["requests"]}'
+        )
+
+    for key, name, help_text in (
+        ('db_queries', 'app_db_queries_total', 'SQL queries run.'),
+        ('db_duration', 'app_db_duration_seconds_total', 'Time in SQL.'),
+        ('serializer_duration', 'app_serializer_duration_seconds_total',
+         'Time serializing responses.'),
+        ('response_bytes', 'app_response_bytes_total',
+         'Bytes of non-streaming response bodies.'),
+        ('n_plus_one', 'app_n_plus_one_total',
+         'Requests that repeated one query shape past the threshold.'),
+    ):
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for view, totals in sorted(views.items()):
+            lines.append(f'{name}{{view="{_label(view)}"}} {totals[key]}')
+
+    for source, values in sorted(sources.items()):
+        for key, value in sorted(values.items()):
+            name = f'app_{source}_{key}'
+            lines += [f'# TYPE {name} gauge', f'{name} {value}']
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,78 @@
+"""
+Request performance middleware
+
+"""
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from core import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def view_label(view_func, method):
+    """`ViewSet.action` for viewsets, `View.method` for other classes."""
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+    actions = getattr(view_func, 'actions', None) or {}
+    return f'{cls.__name__}.{actions.get(method.lower(), method.lower())}'
+
+
+class PerformanceMiddleware:
+    """Time each request and record it under its view.
+
+    Keep it first in MIDDLEWARE so the wall time covers the whole stack.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_metrics, token = metrics.start_request()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(request_metrics.db_wrapper)
+                    )
+                response = self.get_response(request)
+            self.finish(request, request_metrics, response)
+        finally:
+            metrics.end_request(token)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request_metrics = metrics.current_metrics()
+        if request_metrics is not None:
+            request_metrics.view = view_label(view_func, request.method)
+
+    def finish(self, request, request_metrics, response):
+        wall = time.perf_counter() - request_metrics.start
+
+        repeated = request_metrics.repeated_queries(
+            settings.METRICS_N_PLUS_ONE_THRESHOLD
+        )
+        for count, shape in repeated:
+            logger.warning(
+                'Possible N+1 in %s %s (%s): %d runs of %s',
+                request.method, request.path, request_metrics.view,
+                count, shape,
+            )
+
+        size = 0 if response.streaming else len(response.content)
+        metrics.registry.record(
+            request_metrics, response.status_code, wall, size,
+            1 if repeated else 0,
+        )
+        metrics.registry.flush()
+
+        if settings.METRICS_SERVER_TIMING:
+            response['Server-Timing'] = request_metrics.server_timing(wall)
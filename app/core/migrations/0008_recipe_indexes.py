@@ -0,0 +1,58 @@
+# Generated by Django 3.2.25 on 2026-10-17 00:57
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """Fold tags and ingredients sharing (user, name) into the oldest row."""
+    Recipe = apps.get_model('core', 'Recipe')
+    for model_name, field_name in (('Tag', 'tags'), ('Ingredient', 'ingredients')):
+        model = apps.get_model('core', model_name)
+        field = Recipe._meta.get_field(field_name)
+        through = field.remote_field.through
+        related_column = field.m2m_reverse_name()
+        duplicates = model.objects.values('user', 'name').annotate(
+            keep=Min('id'), rows=Count('id'),
+        ).filter(rows__gt=1)
+        for group in duplicates:
+            keep_links = through.objects.filter(
+                **{related_column: group['keep']}
+            ).values('recipe_id')
+            extra = model.objects.filter(
+                user=group['user'], name=group['name'],
+            ).exclude(id=group['keep'])
+            for obj_id in extra.values_list('id', flat=True):
+                through.objects.filter(
+                    **{related_column: obj_id},
+                ).exclude(
+                    recipe_id__in=keep_links,
+                ).update(**{related_column: group['keep']})
+            extra.delete()
+
+    if schema_editor.connection.vendor == 'postgresql':
+        # fire the deferred FK checks now; ALTER TABLE refuses to run on a
+        # table with pending trigger events
+        schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_recipe_versions'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['user', '-id'], name='core_recipe_user_id_desc_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='core_ingredient_user_name_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='core_tag_user_name_uniq'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 3.2.25 on 2026-10-17 01:16
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_VECTOR = """
+    setweight(to_tsvector('english', coalesce(r.title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(t.name, ' ')
+        FROM core_recipe_tags l JOIN core_tag t ON t.id = l.tag_id
+        WHERE l.recipe_id = r.id
+    ), '')), 'B') ||
+    setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(i.name, ' ')
+        FROM core_recipe_ingredients l JOIN core_ingredient i
+            ON i.id = l.ingredient_id
+        WHERE l.recipe_id = r.id
+    ), '')), 'B') ||
+    setweight(to_tsvector('english', coalesce(r.description, '')), 'C')
+"""
+
+
+def create_search_index(apps, schema_editor):
+    """Postgres only: index the search vectors with GIN and backfill them."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX core_recipe_search_gin '
+        'ON core_recipe USING gin (search_vector)'
+    )
+    schema_editor.execute(
+        f'UPDATE core_recipe AS r SET search_vector = {SEARCH_VECTOR}'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS core_recipe_search_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_image_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -2,8 +2,11 @@
 import uuid
 import os
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
+from django.utils import timezone
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
@@ -44,11 +47,34 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    recipes_version = models.PositiveIntegerField(default=0)
+    recipes_modified_at = models.DateTimeField(default=timezone.now)
 
     objects = UserManager()
 
     USERNAME_FIELD = 'email'
 
+    def bump_recipes_version(self):
+        """Record a change to the user's recipes, tags or ingredients.
+
+        The new version numbers every recipe and tombstone written since the
+        last bump (their change_seq is NULL). The version UPDATE locks the
+        user row until commit, so numbers become visible in order.
+        """
+        with transaction.atomic():
+            User.objects.filter(pk=self.pk).update(
+                recipes_version=F('recipes_version') + 1,
+                recipes_modified_at=timezone.now(),
+            )
+            version = User.objects.filter(pk=self.pk).values_list(
+                'recipes_version', flat=True,
+            ).get()
+            for model in (Recipe, RecipeTombstone):
+                model.objects.filter(
+                    user_id=self.pk, change_seq__isnull=True,
+                ).update(change_seq=version)
+        return version
+
 
 class Recipe(models.Model):
     user = models.ForeignKey(
@@ -63,10 +89,76 @@ class Recipe(models.Model):
     tags = models.ManyToManyField('Tag')
     ingredients = models.ManyToManyField('Ingredient')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image_status = models.CharField(
+        max_length=10,
+        blank=True,
+        choices=[
+            ('pending', 'Pending'),
+            ('ready', 'Ready'),
+            ('failed', 'Failed'),
+        ],
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    # maintained by recipe.search, GIN-indexed on Postgres only
+    search_vector = SearchVectorField(null=True, editable=False)
+    # NULL until numbered by User.bump_recipes_version()
+    change_seq = models.PositiveBigIntegerField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-id'],
+                name='core_recipe_user_id_desc_idx',
+            ),
+            models.Index(
+                fields=['user', 'time_minutes', 'id'],
+                name='core_recipe_user_time_idx',
+            ),
+            models.Index(
+                fields=['user', 'price', 'id'],
+                name='core_recipe_user_price_idx',
+            ),
+            models.Index(
+                fields=['user', 'change_seq', 'id'],
+                name='core_recipe_user_change_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        # queue the row for the user's next change number
+        self.change_seq = None
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'change_seq'}
+        super().save(*args, **kwargs)
+
+
+class RecipeTombstone(models.Model):
+    """Deletion of a recipe, kept for clients syncing by change number."""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    recipe_id = models.BigIntegerField()
+    change_seq = models.PositiveBigIntegerField(null=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'change_seq'],
+                name='core_tombstone_user_change_idx',
+            ),
+        ]
+
+    @classmethod
+    def record(cls, user, recipe_ids):
+        cls.objects.bulk_create([
+            cls(user=user, recipe_id=recipe_id) for recipe_id in recipe_ids
+        ])
+
 
 class Tag(models.Model):
     user = models.ForeignKey(
@@ -75,6 +167,14 @@ class Tag(models.Model):
     )
     name = models.CharField(max_length=255)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='core_tag_user_name_uniq',
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -86,5 +186,13 @@ class Ingredient(models.Model):
         on_delete=models.CASCADE
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='core_ingredient_user_name_uniq',
+            ),
+        ]
+
     def __str__(self):
         return self.name
\ No newline at end of file
@@ -0,0 +1,124 @@
+"""
+Shared helpers for tests
+
+"""
+import difflib
+from typing import NamedTuple, Optional
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core.metrics import sql_shape
+from core.middleware import view_label
+
+BUDGET_SIZES = (1, 10, 100)
+
+
+class QueryBudget(NamedTuple):
+    queries: int
+    time_ms: Optional[float] = None
+
+
+def query_budget(action, queries, time_ms=None):
+    """Class decorator declaring the query budget of a view action.
+
+    `action` is labelled like the request metrics, e.g.
+    `RecipeViewSet.list` or `ManageUserView.get`.
+    """
+    def decorate(cls):
+        cls.query_budgets = dict(
+            getattr(cls, 'query_budgets', {}),
+            **{action: QueryBudget(queries, time_ms)},
+        )
+        return cls
+    return decorate
+
+
+def _statements(ctx):
+    return [sql_shape(query['sql']) for query in ctx.captured_queries]
+
+
+class QueryCountMixin:
+    """Assertions about the number of SQL queries a request issues."""
+
+    query_budgets = {}
+
+    def assertConstantQueries(self, request, populate, sizes=(1, 10, 50)):
+        """Assert `request` issues the same number of queries at every size.
+
+        `populate(n)` is called before each measurement and should bring the
+        data set up to `n` rows. `request()` performs the call being measured.
+        """
+        counts = {}
+        for size in sizes:
+            populate(size)
+            with CaptureQueriesContext(connection) as ctx:
+                request()
+            counts[size] = len(ctx.captured_queries)
+
+        self.assertEqual(
+            len(set(counts.values())), 1,
+            f'Query count grows with data size: {counts}',
+        )
+        return counts[sizes[0]]
+
+    def assertWithinBudget(self, action, request, populate=None,
+                           sizes=BUDGET_SIZES):
+        """Assert `request` stays within the budget of `action` at each size.
+
+        `populate` works as for `assertConstantQueries`; `request()` must
+        return the test client's response. On failure the SQL is diffed
+        against the run at the smallest size.
+        """
+        budget = self.query_budgets.get(action)
+        if budget is None:
+            self.fail(f'No query budget declared for {action}')
+
+        first = None
+        for size in sizes:
+            if populate:
+                populate(size)
+            with CaptureQueriesContext(connection) as ctx:
+                response = request()
+            statements = _statements(ctx)
+            elapsed = sum(
+                float(query['time']) for query in ctx.captured_queries
+            ) * 1000
+
+            label = view_label(
+                response.resolver_match.func,
+                response.request['REQUEST_METHOD'],
+            )
+            self.assertEqual(
+                label, action, f'Request was handled by {label}',
+            )
+            self.assertLess(
+                response.status_code, 400,
+                None if response.streaming else response.content,
+            )
+
+            if first is None:
+                first = (size, statements)
+            problems = []
+            if len(statements) > budget.queries:
+                problems.append(
+                    f'{len(statements)} queries, budget {budget.queries}'
+                )
+            if budget.time_ms is not None and elapsed > budget.time_ms:
+                problems.append(
+                    f'{elapsed:.1f} ms in SQL, budget {budget.time_ms} ms'
+                )
+            if problems:
+                self.fail(
+                    f'{action} at {size} rows: {"; ".join(problems)}\n'
+                    + self._sql_report(first, size, statements)
+                )
+
+    def _sql_report(self, first, size, statements):
+        first_size, first_statements = first
+        if first_size == size:
+            return '\n'.join(statements)
+        return '\n'.join(difflib.unified_diff(
+            first_statements, statements,
+            f'{first_size} rows', f'{size} rows', lineterm='',
+        ))
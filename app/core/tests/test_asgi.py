@@ -0,0 +1,137 @@
+"""
+Tests for the read-offloading ASGI handler
+
+"""
+import json
+import threading
+
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+
+from django.contrib.auth import get_user_model
+from django.test import TransactionTestCase, override_settings
+from django.test.client import RequestFactory
+
+from rest_framework.authtoken.models import Token
+
+from core.asgi import ReadOffloadASGIHandler
+from core.models import Recipe
+from user.authentication import token_cache
+
+
+def http_scope(method, path, token):
+    return {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'root_path': '',
+        'query_string': b'',
+        'headers': [
+            (b'host', b'testserver'),
+            (b'accept', b'application/json'),
+            (b'authorization', f'Token {token}'.encode()),
+        ],
+        'client': ('127.0.0.1', 50000),
+        'server': ('testserver', 80),
+    }
+
+
+class ReadOffloadASGIHandlerTests(TransactionTestCase):
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123'
+        )
+        self.token = Token.objects.create(user=self.user).key
+        self.handler = ReadOffloadASGIHandler()
+
+    def tearDown(self):
+        self.handler.executor.shutdown()
+
+    async def request(self, method, path):
+        communicator = ApplicationCommunicator(
+            self.handler, http_scope(method, path, self.token)
+        )
+        await communicator.send_input({
+            'type': 'http.request', 'body': b'', 'more_body': False,
+        })
+        start = await communicator.receive_output(timeout=10)
+        body = b''
+        while True:
+            message = await communicator.receive_output(timeout=10)
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+        await communicator.wait(timeout=10)
+        return start['status'], body
+
+    def test_is_offloaded(self):
+        factory = RequestFactory()
+        self.assertTrue(self.handler.is_offloaded(
+            factory.get('/api/recipe/recipes/')
+        ))
+        self.assertFalse(self.handler.is_offloaded(
+            factory.post('/api/recipe/recipes/')
+        ))
+        self.assertFalse(self.handler.is_offloaded(
+            factory.get('/api/user/me/')
+        ))
+
+    async def test_read_served_from_pool(self):
+        threads = []
+        offloaded = self.handler.get_response_offloaded
+
+        def record(request):
+            threads.append(threading.current_thread().name)
+            return offloaded(request)
+
+        self.handler.get_response_offloaded = record
+        status, body = await self.request('GET', '/api/recipe/recipes/')
+
+        self.assertEqual(status, 200)
+        self.assertIn(b'"results":[]', body)
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads[0].startswith('asgi-read'))
+
+    async def test_write_uses_default_path(self):
+        threads = []
+        self.handler.get_response_offloaded = threads.append
+
+        status, _ = await self.request('DELETE', '/api/recipe/recipes/1/')
+
+        self.assertEqual(status, 404)
+        self.assertEqual(threads, [])
+
+    def test_reads_see_committed_rows(self):
+        Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price='1.00',
+        )
+        status, body = async_to_sync(self.request)(
+            'GET', '/api/recipe/recipes/'
+        )
+
+        self.assertEqual(status, 200)
+        self.assertIn(b'"title":"Soup"', body)
+
+    @override_settings(RECIPE_EXPORT_CHUNK_SIZE=2)
+    def test_streaming_export_reads_from_pool(self):
+        for i in range(5):
+            Recipe.objects.create(
+                user=self.user, title=f'Recipe {i}', time_minutes=5,
+                price='1.00',
+            )
+
+        status, body = async_to_sync(self.request)(
+            'GET', '/api/recipe/recipes/export/'
+        )
+
+        self.assertEqual(status, 200)
+        self.assertEqual(
+            [json.loads(line)['title'] for line in body.splitlines()],
+            [f'Recipe {i}' for i in range(5)],
+        )
@@ -1,11 +1,24 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2Error
 
 
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.models import Ingredient, Recipe, Tag
 
 
 @patch('core.management.commands.wait_for_db.Command.check')
@@ -23,3 +36,297 @@ class CommandTests(SimpleTestCase):
         call_command('wait_for_db')
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=['default'])
+
+
+class ExplainRecipeQueriesTests(TestCase):
+
+    def test_seed_and_explain(self):
+        out = StringIO()
+        call_command('explain_recipe_queries', seed=30, stdout=out)
+
+        user = get_user_model().objects.get(email='bench@example.com')
+        self.assertEqual(Recipe.objects.filter(user=user).count(), 30)
+        self.assertEqual(Tag.objects.filter(user=user).count(), 50)
+        self.assertIn('recipe list, first page', out.getvalue())
+
+    def test_assigned_tags_explained_as_the_api_sends_them(self):
+        with CaptureQueriesContext(connection) as ctx:
+            call_command('explain_recipe_queries', stdout=StringIO())
+
+        explained = [
+            query['sql'] for query in ctx.captured_queries
+            if query['sql'].startswith('EXPLAIN') and 'core_tag' in
+            query['sql'] and 'core_recipe_tags' in query['sql']
+        ]
+        self.assertEqual(len(explained), 1)
+        self.assertIn('EXISTS', explained[0])
+        self.assertNotIn('DISTINCT', explained[0])
+
+
+class SeedRecipesTests(TestCase):
+
+    def test_seed_users(self):
+        call_command(
+            'seed_recipes', users=2, recipes=12, tags=5, ingredients=8,
+            stdout=StringIO(),
+        )
+
+        for i in range(2):
+            user = get_user_model().objects.get(email=f'bench{i}@example.com')
+            recipes = Recipe.objects.filter(user=user)
+            self.assertEqual(recipes.count(), 12)
+            self.assertEqual(Tag.objects.filter(user=user).count(), 5)
+            self.assertEqual(Ingredient.objects.filter(user=user).count(), 8)
+            self.assertEqual(
+                Recipe.tags.through.objects.filter(
+                    recipe__user=user,
+                ).count(),
+                24,
+            )
+            self.assertFalse(recipes.filter(change_seq__isnull=True).exists())
+
+    def test_rerun_tops_up(self):
+        call_command('seed_recipes', recipes=5, stdout=StringIO())
+        call_command('seed_recipes', recipes=8, stdout=StringIO())
+
+        self.assertEqual(Recipe.objects.count(), 8)
+        self.assertEqual(
+            list(Recipe.objects.order_by('id').values_list(
+                'title', flat=True,
+            )),
+            [f'Recipe {n}' for n in range(8)],
+        )
+
+
+@override_settings(RECIPE_LIST_CACHE_ENABLED=False)
+class BenchmarkRecipesTests(TestCase):
+
+    def setUp(self):
+        call_command('seed_recipes', recipes=20, stdout=StringIO())
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.output = os.path.join(self.directory, 'run.json')
+
+    def test_writes_results(self):
+        out = StringIO()
+        call_command(
+            'benchmark_recipes', requests=3, warmup=1,
+            output=self.output, stdout=out,
+        )
+
+        with open(self.output) as output:
+            run = json.load(output)
+        self.assertEqual(
+            list(run['scenarios']),
+            ['list', 'filtered_list', 'detail', 'create', 'image_upload'],
+        )
+        for name, result in run['scenarios'].items():
+            self.assertEqual(result['errors'], 0, name)
+            self.assertGreater(result['queries'], 0, name)
+        self.assertIn('p95', out.getvalue())
+        self.assertEqual(Recipe.objects.count(), 20)
+
+    def test_compare_flags_more_queries(self):
+        call_command(
+            'benchmark_recipes', scenario=['detail'], requests=2, warmup=0,
+            output=self.output, stdout=StringIO(),
+        )
+        with open(self.output) as output:
+            run = json.load(output)
+        run['scenarios']['detail']['queries'] -= 1
+        with open(self.output, 'w') as output:
+            json.dump(run, output)
+
+        with self.assertRaisesMessage(CommandError, 'Regressed: detail'):
+            call_command(
+                'benchmark_recipes', scenario=['detail'], requests=2,
+                warmup=0, compare=self.output, threshold=1000,
+                stdout=StringIO(),
+            )
+
+
+class LoadRecipesTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'partner@example.com', 'testpass123',
+        )
+        self.other = get_user_model().objects.create_user(
+            'other@example.com', 'testpass123',
+        )
+        Tag.objects.create(user=self.user, name='vegan')
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as source:
+            source.write(content)
+        return path
+
+    def jsonl(self, rows):
+        return self.write(
+            'recipes.jsonl', ''.join(json.dumps(row) + '\n' for row in rows),
+        )
+
+    def recipe_row(self, i, **extra):
+        return dict({
+            'title': f'Imported {i}',
+            'time_minutes': 10 + i,
+            'price': '3.50',
+            'tags': ['vegan', f'tag {i % 2}'],
+            'ingredients': ['salt'],
+        }, **extra)
+
+    def test_load_jsonl(self):
+        path = self.jsonl([
+            self.recipe_row(0),
+            self.recipe_row(1),
+            self.recipe_row(2, user='other@example.com'),
+            {'title': 'No time', 'price': '1.00'},
+            self.recipe_row(4, user='nobody@example.com'),
+        ])
+        out = StringIO()
+        err = StringIO()
+
+        call_command(
+            'load_recipes', path, user='partner@example.com', chunk_size=2,
+            stdout=out, stderr=err,
+        )
+
+        recipes = Recipe.objects.filter(user=self.user).order_by('id')
+        self.assertEqual(
+            [recipe.title for recipe in recipes], ['Imported 0', 'Imported 1'],
+        )
+        self.assertEqual(Recipe.objects.filter(user=self.other).count(), 1)
+        self.assertEqual(
+            sorted(Tag.objects.filter(user=self.user).values_list(
+                'name', flat=True,
+            )),
+            ['tag 0', 'tag 1', 'vegan'],
+        )
+        self.assertEqual(
+            sorted(recipes[1].tags.values_list('name', flat=True)),
+            ['tag 1', 'vegan'],
+        )
+        self.assertEqual(
+            list(recipes[0].ingredients.values_list('name', flat=True)),
+            ['salt'],
+        )
+        self.assertFalse(
+            Recipe.objects.filter(change_seq__isnull=True).exists()
+        )
+        self.assertIn('Loaded 3 recipes', out.getvalue())
+        self.assertIn('Row 4 rejected', err.getvalue())
+        self.assertIn('Row 5 rejected', err.getvalue())
+
+    def test_load_csv(self):
+        path = self.write(
+            'recipes.csv',
+            'title,time_minutes,price,tags,ingredients\n'
+            'Stew,45,9.99,winter|vegan,beef|carrot\n'
+            'Salad,5,4.00,,\n',
+        )
+
+        call_command(
+            'load_recipes', path, user='partner@example.com',
+            stdout=StringIO(),
+        )
+
+        stew = Recipe.objects.get(title='Stew')
+        self.assertEqual(
+            sorted(stew.tags.values_list('name', flat=True)),
+            ['vegan', 'winter'],
+        )
+        self.assertEqual(stew.ingredients.count(), 2)
+        self.assertFalse(Recipe.objects.get(title='Salad').tags.exists())
+
+    def test_csv_blank_user_falls_back_to_default(self):
+        path = self.write(
+            'recipes.csv',
+            'user,title,time_minutes,price\n'
+            ',Stew,45,9.99\n'
+            'other@example.com,Salad,5,4.00\n',
+        )
+
+        call_command(
+            'load_recipes', path, user='partner@example.com',
+            stdout=StringIO(),
+        )
+
+        self.assertEqual(Recipe.objects.get(title='Stew').user, self.user)
+        self.assertEqual(Recipe.objects.get(title='Salad').user, self.other)
+
+    def test_resume_from_checkpoint(self):
+        path = self.jsonl([self.recipe_row(i) for i in range(4)])
+        checkpoint = f'{path}.checkpoint'
+        with open(checkpoint, 'w') as checkpoint_file:
+            json.dump({
+                'path': path, 'size': os.path.getsize(path),
+                'row': 2, 'loaded': 2, 'rejected': 0,
+            }, checkpoint_file)
+
+        call_command(
+            'load_recipes', path, user='partner@example.com',
+            stdout=StringIO(),
+        )
+
+        self.assertEqual(
+            sorted(Recipe.objects.values_list('title', flat=True)),
+            ['Imported 2', 'Imported 3'],
+        )
+        with open(checkpoint) as checkpoint_file:
+            self.assertEqual(json.load(checkpoint_file)['loaded'], 4)
+
+    def test_changed_file_not_resumed(self):
+        path = self.jsonl([self.recipe_row(0)])
+        with open(f'{path}.checkpoint', 'w') as checkpoint_file:
+            json.dump({'size': 1, 'row': 1}, checkpoint_file)
+
+        with self.assertRaisesMessage(CommandError, '--restart'):
+            call_command(
+                'load_recipes', path, user='partner@example.com',
+                stdout=StringIO(),
+            )
+
+
+class BenchJSONRenderersTests(SimpleTestCase):
+
+    def test_renderers_agree(self):
+        out = StringIO()
+        call_command('bench_json_renderers', count=5, repeat=1, stdout=out)
+
+        self.assertIn('ORJSONRenderer', out.getvalue())
+
+
+class LoadTestCommandTests(SimpleTestCase):
+
+    def setUp(self):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.end_headers()
+                self.wfile.write(b'{}')
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def test_reports_percentiles(self):
+        out = StringIO()
+        url = f'http://127.0.0.1:{self.server.server_port}/'
+        call_command(
+            'loadtest', url, concurrency=4, requests=20, stdout=out,
+        )
+
+        output = out.getvalue()
+        self.assertIn('20 ok, 0 errors', output)
+        self.assertIn('p99', output)
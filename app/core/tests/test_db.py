@@ -0,0 +1,66 @@
+"""
+Tests for connection health checks and instrumentation
+
+"""
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TransactionTestCase
+
+from core.db import (
+    check_connection_health,
+    connection_stats,
+    record_connections_closed,
+)
+
+
+class ConnectionHealthTests(TransactionTestCase):
+
+    def setUp(self):
+        connection.ensure_connection()
+        connection_stats.clear()
+        connection_stats.connection_opened(connection)
+
+    def test_unusable_connection_closed(self):
+        settings_dict = dict(connection.settings_dict, CONN_HEALTH_CHECKS=True)
+        with patch.object(connection, 'settings_dict', settings_dict), \
+                patch.object(connection, 'is_usable', return_value=False), \
+                patch.object(connection, 'close') as close:
+            check_connection_health()
+
+        close.assert_called_once_with()
+        stats = connection_stats.stats()
+        self.assertEqual(stats['health_check_failures'], 1)
+        self.assertEqual(stats['closed'], 1)
+        self.assertEqual(stats['open'], 0)
+
+    def test_health_checks_disabled(self):
+        settings_dict = dict(
+            connection.settings_dict, CONN_HEALTH_CHECKS=False,
+        )
+        with patch.object(connection, 'settings_dict', settings_dict), \
+                patch.object(connection, 'is_usable') as is_usable:
+            check_connection_health()
+
+        is_usable.assert_not_called()
+
+    def test_lifetime_recorded_once(self):
+        with patch.object(connection, 'connection', None):
+            record_connections_closed()
+            record_connections_closed()
+
+        stats = connection_stats.stats()
+        self.assertEqual(stats['opened'], 1)
+        self.assertEqual(stats['closed'], 1)
+        self.assertGreaterEqual(stats['lifetime_max'], 0)
+
+
+class WaitForDBWarmTests(TransactionTestCase):
+
+    def test_warm_opens_connections(self):
+        out = StringIO()
+        call_command('wait_for_db', warm=3, stdout=out)
+
+        self.assertIn('Warmed 3 connections', out.getvalue())
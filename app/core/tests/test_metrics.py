@@ -0,0 +1,150 @@
+"""
+Tests for request performance metrics
+
+"""
+import json
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.metrics import RequestMetrics, registry, sql_shape
+
+RECIPE_URL = reverse('recipe:recipe-list')
+METRICS_URL = reverse('metrics')
+
+
+class SqlShapeTests(TestCase):
+
+    def test_literals_and_in_lists_folded(self):
+        self.assertEqual(
+            sql_shape(
+                "SELECT * FROM t WHERE a = 5 AND b = 'x' "
+                'AND c IN (%s, %s, %s)'
+            ),
+            'SELECT * FROM t WHERE a = ? AND b = ? AND c IN (...)',
+        )
+
+    def test_interpolated_sql_folded(self):
+        self.assertEqual(
+            sql_shape('SELECT * FROM t WHERE id IN (1, 2, 3)'),
+            sql_shape('SELECT * FROM t WHERE id IN (4)'),
+        )
+        self.assertEqual(
+            sql_shape('SAVEPOINT "s1403_x41"'),
+            sql_shape('SAVEPOINT "s17_x2"'),
+        )
+
+    def test_repeated_queries(self):
+        metrics = RequestMetrics()
+        metrics.shapes.update({
+            'SELECT * FROM t WHERE id = 1': 1,
+            'SELECT * FROM t WHERE id = 2': 2,
+            'SELECT * FROM u': 1,
+        })
+
+        self.assertEqual(
+            metrics.repeated_queries(3),
+            [(3, 'SELECT * FROM t WHERE id = ?')],
+        )
+        self.assertEqual(metrics.repeated_queries(4), [])
+
+
+@override_settings(METRICS_DIR='', METRICS_TOKEN='secret')
+class PerformanceMiddlewareTests(TestCase):
+
+    def setUp(self):
+        registry.clear()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def scrape(self):
+        return self.client.get(
+            METRICS_URL, HTTP_AUTHORIZATION='Bearer secret',
+        ).content.decode()
+
+    def test_server_timing_header(self):
+        res = self.client.get(RECIPE_URL)
+
+        timing = res['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('serialize;dur=', timing)
+        self.assertIn('app;dur=', timing)
+
+    @override_settings(METRICS_SERVER_TIMING=False)
+    def test_server_timing_disabled(self):
+        res = self.client.get(RECIPE_URL)
+
+        self.assertNotIn('Server-Timing', res)
+
+    def test_request_recorded_under_action(self):
+        self.client.get(RECIPE_URL)
+
+        totals = registry.snapshot()['views']['RecipeViewSet.list']
+        self.assertEqual(totals['requests'], 1)
+        self.assertGreater(totals['db_queries'], 0)
+        self.assertGreater(totals['response_bytes'], 0)
+        self.assertGreater(totals['serializer_duration'], 0)
+
+    @override_settings(METRICS_N_PLUS_ONE_THRESHOLD=1)
+    def test_repeated_query_shape_flagged(self):
+        with self.assertLogs('core.middleware', 'WARNING') as logs:
+            self.client.get(RECIPE_URL)
+
+        self.assertIn('RecipeViewSet.list', logs.output[0])
+        totals = registry.snapshot()['views']['RecipeViewSet.list']
+        self.assertEqual(totals['n_plus_one'], 1)
+
+    def test_metrics_endpoint(self):
+        self.client.get(RECIPE_URL)
+
+        body = self.scrape()
+
+        self.assertIn(
+            'app_requests_total{view="RecipeViewSet.list",status="200"} 1',
+            body,
+        )
+        self.assertIn(
+            'app_request_duration_seconds_count{view="RecipeViewSet.list"} 1',
+            body,
+        )
+        self.assertIn('app_recipe_list_cache_misses', body)
+        self.assertIn('app_db_connections_opened', body)
+
+    def test_metrics_endpoint_requires_token(self):
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 403)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_metrics_endpoint_hidden_without_token(self):
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 404)
+
+    def test_workers_summed(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.client.get(RECIPE_URL)
+        other_worker = registry.snapshot()
+        with open(os.path.join(directory, '0.json'), 'w') as snapshot_file:
+            json.dump(other_worker, snapshot_file)
+
+        with self.settings(METRICS_DIR=directory):
+            body = self.scrape()
+
+        self.assertIn(
+            'app_requests_total{view="RecipeViewSet.list",status="200"} 2',
+            body,
+        )
+        self.assertTrue(
+            os.path.exists(os.path.join(directory, f'{os.getpid()}.json'))
+        )
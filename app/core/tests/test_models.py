@@ -95,3 +95,34 @@ class ModelTests(TestCase):
         mock_uuid.return_value = uuid
         file_path = models.recipe_image_file_path(None, 'example.jpg')
         self.assertEqual(file_path, f'uploads/recipe/{uuid}.jpg')
+
+    def test_bump_recipes_version(self):
+        """Test bumping the user's recipe collection version"""
+        user = create_user('test@example.com', 'test123')
+        modified_at = user.recipes_modified_at
+
+        user.bump_recipes_version()
+        user.refresh_from_db()
+
+        self.assertEqual(user.recipes_version, 1)
+        self.assertGreater(user.recipes_modified_at, modified_at)
+
+    def test_bump_numbers_pending_changes(self):
+        """Test bumping numbers recipes and tombstones written since"""
+        user = create_user('test@example.com', 'test123')
+        recipe = models.Recipe.objects.create(
+            user=user, title='Soup', time_minutes=5, price=Decimal('1.00'),
+        )
+        models.RecipeTombstone.record(user, [999])
+
+        version = user.bump_recipes_version()
+        recipe.refresh_from_db()
+
+        self.assertEqual(recipe.change_seq, version)
+        self.assertEqual(
+            models.RecipeTombstone.objects.get(user=user).change_seq, version,
+        )
+
+        recipe.save(update_fields=['title'])
+        recipe.refresh_from_db()
+        self.assertIsNone(recipe.change_seq)
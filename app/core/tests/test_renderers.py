@@ -0,0 +1,75 @@
+"""
+Tests for the JSON renderer and parser
+
+"""
+import datetime
+import io
+import uuid
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import ORJSONParser
+from core.renderers import ORJSONRenderer
+
+
+class ORJSONRendererTests(SimpleTestCase):
+
+    def assertSameOutput(self, data, accepted_media_type=None):
+        expected = JSONRenderer().render(data, accepted_media_type)
+        rendered = ORJSONRenderer().render(data, accepted_media_type)
+        self.assertEqual(rendered, expected)
+
+    def test_matches_json_renderer(self):
+        data = OrderedDict([
+            ('id', 1),
+            ('price', Decimal('5.25')),
+            ('uuid', uuid.UUID('12345678123456781234567812345678')),
+            ('created', timezone.now()),
+            ('naive', datetime.datetime(2024, 1, 2, 3, 4, 5, 678901)),
+            ('day', datetime.date(2024, 1, 2)),
+            ('time', datetime.time(3, 4, 5, 678901)),
+            ('duration', datetime.timedelta(minutes=90)),
+            ('lazy', gettext_lazy('Not found.')),
+            ('tags', [{'id': 1, 'name': 'caf\u00e9\u2028line'}]),
+            ('empty', None),
+            (3, 'int key'),
+        ])
+
+        self.assertSameOutput(data)
+
+    def test_indented_output_matches(self):
+        self.assertSameOutput(
+            {'results': [1, 2]}, 'application/json; indent=4'
+        )
+
+    def test_none_renders_empty(self):
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+    def test_unsupported_values_fall_back(self):
+        self.assertSameOutput({'big': 2 ** 70, 'set': {1}})
+
+
+class ORJSONParserTests(SimpleTestCase):
+
+    def parse(self, body, parser=ORJSONParser):
+        return parser().parse(io.BytesIO(body))
+
+    def test_matches_json_parser(self):
+        body = b'{"title": "caf\\u00e9", "price": "5.25", "tags": [1, 2]}'
+
+        self.assertEqual(self.parse(body), self.parse(body, JSONParser))
+
+    def test_big_integers_fall_back(self):
+        self.assertEqual(self.parse(b'{"n": 1180591620717411303424}'),
+                         {'n': 2 ** 70})
+
+    def test_invalid_json_raises_parse_error(self):
+        with self.assertRaises(ParseError):
+            self.parse(b'{"title": ')
@@ -0,0 +1,34 @@
+"""
+Views for the core app
+
+"""
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_GET
+
+from core.metrics import registry, render_prometheus
+
+
+@require_GET
+def metrics(request):
+    """Prometheus text metrics summed across all workers.
+
+    Requires `Authorization: Bearer <METRICS_TOKEN>`; without a configured
+    token the endpoint only exists in DEBUG.
+    """
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    token = settings.METRICS_TOKEN
+    if token:
+        supplied = request.META.get('HTTP_AUTHORIZATION', '')
+        if not hmac.compare_digest(supplied, f'Bearer {token}'):
+            return HttpResponseForbidden()
+    elif not settings.DEBUG:
+        raise Http404
+
+    return HttpResponse(
+        render_prometheus(registry.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
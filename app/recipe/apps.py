@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class RecipeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipe'
+
+    def ready(self):
+        from core.metrics import registry
+        from recipe.cache import list_cache
+
+        registry.register_stats(
+            'recipe_list_cache', list_cache.stats, ['hits', 'misses'],
+        )
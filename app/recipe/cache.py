@@ -0,0 +1,69 @@
+"""
+Cache for the list endpoints of the recipe API
+
+"""
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+def query_digest(request):
+    """Digest of the host, path and normalized query string of a request."""
+    params = sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        for value in values
+    )
+    return hashlib.md5(
+        repr((request.get_host(), request.path, params)).encode()
+    ).hexdigest()
+
+
+class ListCache:
+    """Serialized list payloads stored per user and per query string.
+
+    Every key embeds the user's `recipes_version` and `recipes_modified_at`
+    as read from the database, so a write made by any process makes all of
+    the user's cached lists stale at once. Old entries age out through the
+    cache timeout.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return settings.RECIPE_LIST_CACHE_ENABLED
+
+    @property
+    def cache(self):
+        return caches[settings.RECIPE_LIST_CACHE_ALIAS]
+
+    def make_key(self, request, namespace, version, modified_at):
+        # modified_at tells apart users that reuse a deleted user's id
+        stamp = f'{version}.{int(modified_at.timestamp() * 1e6)}'
+        digest = query_digest(request)
+        return f'recipe-list:{namespace}:{request.user.id}:{stamp}:{digest}'
+
+    def get(self, key):
+        payload = self.cache.get(key)
+        with self._lock:
+            if payload is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return payload
+
+    def set(self, key, payload):
+        self.cache.set(key, payload, settings.RECIPE_LIST_CACHE_TIMEOUT)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+
+list_cache = ListCache()
@@ -0,0 +1,78 @@
+"""
+Streaming export of a user's recipes
+
+Rows are read with `.values().iterator()`, a server-side cursor on
+Postgres, and rendered a chunk at a time: each chunk costs one query for
+its tags and one for its ingredients, and only one chunk is held in
+memory, whatever the size of the collection.
+"""
+import csv
+import io
+
+from core.renderers import ORJSONRenderer
+from recipe.importer import CSV_LIST_SEPARATOR
+from recipe.serializers import RecipeExportSerializer
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'recipes.ndjson'),
+    'csv': ('text/csv; charset=utf-8', 'recipes.csv'),
+}
+# the columns `load_recipes` reads back
+CSV_COLUMNS = [
+    'id', 'title', 'description', 'time_minutes', 'price', 'link', 'tags',
+    'ingredients',
+]
+
+
+def _serialize(rows, context):
+    return RecipeExportSerializer(rows, many=True, context=context).data
+
+
+def export_chunks(queryset, context, chunk_size):
+    """Yield lists of serialized recipes, `chunk_size` at a time."""
+    rows = queryset.values(
+        *RecipeExportSerializer.Meta.value_fields
+    ).iterator(chunk_size=chunk_size)
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield _serialize(chunk, context)
+            chunk = []
+    if chunk:
+        yield _serialize(chunk, context)
+
+
+def render_ndjson(chunks):
+    renderer = ORJSONRenderer()
+    for chunk in chunks:
+        yield b''.join(renderer.render(item) + b'\n' for item in chunk)
+
+
+def render_csv(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    # the header goes out before the first query
+    yield buffer.getvalue().encode()
+    for chunk in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        for item in chunk:
+            writer.writerow([
+                CSV_LIST_SEPARATOR.join(
+                    related['name'] for related in item[column]
+                ) if column in ('tags', 'ingredients') else item[column]
+                for column in CSV_COLUMNS
+            ])
+        yield buffer.getvalue().encode()
+
+
+RENDERERS = {'ndjson': render_ndjson, 'csv': render_csv}
+
+
+def export_recipes(queryset, export_format, context, chunk_size):
+    """Iterator of the encoded export, for a StreamingHttpResponse."""
+    return RENDERERS[export_format](
+        export_chunks(queryset, context, chunk_size)
+    )
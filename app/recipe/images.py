@@ -0,0 +1,175 @@
+"""
+Background processing of uploaded recipe images
+
+Uploads are saved as-is and the recipe is marked pending. After the
+request's transaction commits, a worker thread re-encodes the original into
+resized variants with Pillow and marks the recipe ready (or failed). The
+status column doubles as the job table: `process_recipe_images`, run by
+scripts/run.sh before the server starts, picks up anything left pending by
+a restart.
+"""
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from core.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+# variant name -> (longest edge in pixels, encoding)
+VARIANTS = {
+    'thumbnail': (320, 'JPEG'),
+    'thumbnail_webp': (320, 'WEBP'),
+    'medium': (800, 'JPEG'),
+    'medium_webp': (800, 'WEBP'),
+    'large': (1600, 'JPEG'),
+}
+EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True, 'progressive': True},
+    'WEBP': {'quality': 80, 'method': 4},
+}
+
+
+def variant_path(image_name, variant):
+    """Storage path of a variant, derived from the original's path.
+
+    Originals get a fresh uuid name on every upload, so a variant path never
+    changes content and can be cached by clients indefinitely.
+    """
+    head, filename = os.path.split(image_name)
+    stem = os.path.splitext(filename)[0]
+    extension = EXTENSIONS[VARIANTS[variant][1]]
+    return os.path.join(head, 'variants', stem, f'{variant}.{extension}')
+
+
+def image_variant_urls(image_name, image_status, storage, request=None):
+    """Map of variant name to URL once an image's variants are ready."""
+    if not image_name or image_status != 'ready':
+        return {}
+    urls = {}
+    for variant in VARIANTS:
+        url = storage.url(variant_path(image_name, variant))
+        urls[variant] = request.build_absolute_uri(url) if request else url
+    return urls
+
+
+def variant_urls(recipe, request=None):
+    return image_variant_urls(
+        recipe.image.name, recipe.image_status, recipe.image.storage, request,
+    )
+
+
+def render_variants(recipe, overwrite=True):
+    """Write the variants of the recipe's image to its storage.
+
+    With `overwrite` False only the variants missing from storage are made.
+    """
+    storage = recipe.image.storage
+    names = {
+        variant: variant_path(recipe.image.name, variant)
+        for variant in VARIANTS
+    }
+    if not overwrite:
+        names = {
+            variant: name for variant, name in names.items()
+            if not storage.exists(name)
+        }
+    if not names:
+        return
+
+    with recipe.image.open('rb') as original:
+        image = Image.open(original)
+        image = ImageOps.exif_transpose(image).convert('RGB')
+
+    for variant, name in names.items():
+        size, encoding = VARIANTS[variant]
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)
+        buffer = io.BytesIO()
+        resized.save(buffer, encoding, **SAVE_OPTIONS[encoding])
+        storage.delete(name)
+        storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def delete_variants(image_name, storage):
+    """Remove the variants of an image that was replaced or dropped."""
+    for variant in VARIANTS:
+        storage.delete(variant_path(image_name, variant))
+
+
+def process_recipe_image(recipe_id, overwrite=True):
+    """Render the variants of one recipe and record the outcome."""
+    recipe = Recipe.objects.filter(pk=recipe_id).first()
+    if recipe is None or not recipe.image:
+        return None
+
+    try:
+        render_variants(recipe, overwrite)
+        image_status = 'ready'
+    except Exception:
+        logger.exception('Processing image of recipe %s failed', recipe_id)
+        image_status = 'failed'
+
+    # a newer upload owns the status if the image changed meanwhile
+    updated = Recipe.objects.filter(
+        pk=recipe_id, image=recipe.image.name,
+    ).update(
+        image_status=image_status, updated_at=timezone.now(), change_seq=None,
+    )
+    if updated:
+        get_user_model()(pk=recipe.user_id).bump_recipes_version()
+    else:
+        # the upload that replaced this image already removed its variants
+        delete_variants(recipe.image.name, recipe.image.storage)
+    return image_status
+
+
+class ImageWorker:
+    """Bounded thread pool that processes recipe images in the background."""
+
+    def __init__(self):
+        self._executor = None
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.RECIPE_IMAGE_WORKERS,
+                thread_name_prefix='recipe-image',
+            )
+        return self._executor
+
+    def run(self, recipe_id):
+        close_old_connections()
+        try:
+            return process_recipe_image(recipe_id)
+        finally:
+            close_old_connections()
+
+    def submit(self, recipe_id):
+        if settings.RECIPE_IMAGE_PROCESSING == 'sync':
+            return process_recipe_image(recipe_id)
+        return self.executor.submit(self.run, recipe_id)
+
+    def enqueue(self, recipe_id):
+        """Process the recipe's image once the current transaction commits."""
+        transaction.on_commit(lambda: self.submit(recipe_id))
+
+    def drain(self):
+        """Wait for every submitted image to finish processing."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+image_worker = ImageWorker()
@@ -0,0 +1,232 @@
+"""
+Bulk loading of recipes from JSONL or CSV files
+
+Rows are read one at a time and validated in chunks. Each chunk is written
+in one transaction with bulk inserts, or with COPY on Postgres. Tag and
+ingredient names resolve through per-user maps that only query for names
+they have not seen yet, so memory grows with the vocabulary, not the file.
+"""
+import csv
+import io
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.search import update_search_vectors
+from recipe.serializers import (
+    RecipeImportSerializer,
+    get_or_create_by_name,
+    link_related,
+)
+
+FORMATS = ['jsonl', 'csv']
+# separates the names in the tags and ingredients columns of a CSV file
+CSV_LIST_SEPARATOR = '|'
+RELATED = {'tags': Tag, 'ingredients': Ingredient}
+
+
+def read_rows(source, file_format):
+    """Yield (row number, row) from an open file; row is None if unparsable.
+
+    JSONL rows are numbered by line, CSV rows by record after the header.
+    """
+    if file_format == 'csv':
+        for number, row in enumerate(csv.DictReader(source), 1):
+            for field in RELATED:
+                names = row.get(field) or ''
+                row[field] = [
+                    name for name in names.split(CSV_LIST_SEPARATOR)
+                    if name.strip()
+                ]
+            yield number, row
+        return
+
+    for number, line in enumerate(source, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else None
+
+
+class NameMap:
+    """(user id, name) -> id of the user's tag or ingredient."""
+
+    def __init__(self, model):
+        self.model = model
+        self.ids = {}
+
+    def resolve(self, user_id, names):
+        """Make sure every name has an id, creating the missing rows."""
+        missing = [
+            name for name in dict.fromkeys(names)
+            if (user_id, name) not in self.ids
+        ]
+        if missing:
+            user = get_user_model()(pk=user_id)
+            objs = get_or_create_by_name(self.model, user, missing)
+            for name, obj in objs.items():
+                self.ids[user_id, name] = obj.id
+
+    def __getitem__(self, key):
+        return self.ids[key]
+
+
+class RecipeLoader:
+    """Validates and writes chunks of rows for `load_recipes`.
+
+    Rows name their owner by email in a `user` column; rows without one,
+    or with a blank one, belong to `default_user`. With `use_copy` the
+    recipes and their links are written with COPY, which needs Postgres.
+    """
+
+    def __init__(self, default_user=None, use_copy=False):
+        self.default_user = default_user
+        self.use_copy = use_copy
+        self.users = {}
+        if default_user is not None:
+            self.users[default_user.email] = default_user.pk
+        self.names = {
+            field: NameMap(model) for field, model in RELATED.items()
+        }
+
+    def _user_id(self, email):
+        if not email:
+            return self.default_user.pk if self.default_user else None
+        email = get_user_model().objects.normalize_email(email)
+        if email not in self.users:
+            self.users[email] = get_user_model().objects.filter(
+                email=email,
+            ).values_list('id', flat=True).first()
+        return self.users[email]
+
+    def validate(self, rows):
+        """Split rows into [(user id, data)] and [(row number, errors)]."""
+        valid = []
+        rejected = []
+        for number, row in rows:
+            if row is None:
+                rejected.append((number, {'row': ['Not a JSON object.']}))
+                continue
+            serializer = RecipeImportSerializer(data=row)
+            if not serializer.is_valid():
+                rejected.append((number, serializer.errors))
+                continue
+            data = serializer.validated_data
+            user_id = self._user_id(data.get('user'))
+            if user_id is None:
+                rejected.append((number, {'user': ['No such user.']}))
+                continue
+            valid.append((user_id, data))
+        return valid, rejected
+
+    def load_chunk(self, rows):
+        """Write the valid rows in one transaction.
+
+        Returns the number of recipes written and the rejected rows.
+        """
+        valid, rejected = self.validate(rows)
+        if not valid:
+            return 0, rejected
+
+        with transaction.atomic():
+            for field, names in self.names.items():
+                wanted = {}
+                for user_id, data in valid:
+                    wanted.setdefault(user_id, []).extend(data.get(field, []))
+                for user_id, user_names in wanted.items():
+                    names.resolve(user_id, user_names)
+
+            if self.use_copy:
+                recipe_ids = self._copy_recipes(valid)
+            else:
+                recipe_ids = self._insert_recipes(valid)
+
+            for field, names in self.names.items():
+                pairs = [
+                    (recipe_id, names[user_id, name])
+                    for recipe_id, (user_id, data) in zip(recipe_ids, valid)
+                    for name in dict.fromkeys(data.get(field, []))
+                ]
+                if self.use_copy:
+                    self._copy_links(field, pairs)
+                else:
+                    link_related(field, pairs)
+
+            update_search_vectors(recipe_ids)
+            for user_id in {user_id for user_id, _ in valid}:
+                get_user_model()(pk=user_id).bump_recipes_version()
+        return len(recipe_ids), rejected
+
+    def _recipe(self, user_id, data):
+        return Recipe(
+            user_id=user_id,
+            title=data['title'],
+            description=data.get('description', ''),
+            time_minutes=data['time_minutes'],
+            price=data['price'],
+            link=data.get('link', ''),
+        )
+
+    def _insert_recipes(self, valid):
+        recipes = [self._recipe(user_id, data) for user_id, data in valid]
+        if connection.features.can_return_rows_from_bulk_insert:
+            Recipe.objects.bulk_create(recipes)
+        else:
+            for recipe in recipes:
+                recipe.save()
+        return [recipe.id for recipe in recipes]
+
+    def _copy(self, cursor, table, columns, rows, not_null=()):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        qn = connection.ops.quote_name
+        options = 'FORMAT csv'
+        if not_null:
+            options += f', FORCE_NOT_NULL ({", ".join(map(qn, not_null))})'
+        cursor.copy_expert(
+            f'COPY {qn(table)} ({", ".join(map(qn, columns))}) '
+            f'FROM STDIN WITH ({options})',
+            buffer,
+        )
+
+    def _copy_recipes(self, valid):
+        table = Recipe._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) "
+                'FROM generate_series(1, %s)',
+                [table, len(valid)],
+            )
+            recipe_ids = [row[0] for row in cursor.fetchall()]
+            now = timezone.now().isoformat()
+            self._copy(
+                cursor, table,
+                ['id', 'user_id', 'title', 'description', 'time_minutes',
+                 'price', 'link', 'image', 'image_status', 'updated_at'],
+                [
+                    [recipe_id, user_id, data['title'],
+                     data.get('description', ''), data['time_minutes'],
+                     data['price'], data.get('link', ''), '', '', now]
+                    for recipe_id, (user_id, data) in zip(recipe_ids, valid)
+                ],
+                not_null=['description', 'link', 'image', 'image_status'],
+            )
+        return recipe_ids
+
+    def _copy_links(self, field_name, pairs):
+        if not pairs:
+            return
+        field = Recipe._meta.get_field(field_name)
+        with connection.cursor() as cursor:
+            self._copy(
+                cursor, field.remote_field.through._meta.db_table,
+                [field.m2m_column_name(), field.m2m_reverse_name()],
+                pairs,
+            )
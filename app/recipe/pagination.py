@@ -0,0 +1,120 @@
+"""
+Pagination for the recipe API
+
+"""
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Keyset pagination over the newest-first ordering of the API.
+
+    Pages are addressed by an opaque cursor holding the last seen id, so a
+    deep page costs the same as the first one and no COUNT(*) is issued.
+
+    A view may order by another column through `get_pagination_ordering`,
+    returning (column, id) with both in the same direction. The cursor then
+    holds both values and pages with `(column, id) < (value, last id)`, so
+    runs of equal values never fall back to OFFSET.
+    """
+    ordering = '-id'
+    page_size_query_param = 'page_size'
+
+    @property
+    def max_page_size(self):
+        return settings.API_MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        """Let the view replace the ordering, e.g. by search rank."""
+        get_ordering = getattr(view, 'get_pagination_ordering', None)
+        ordering = get_ordering() if get_ordering else None
+        if ordering:
+            return tuple(ordering)
+        return super().get_ordering(request, queryset, view)
+
+    def _is_composite(self, ordering):
+        return len(ordering) == 2 and ordering[1].lstrip('-') == 'id'
+
+    def _get_position_from_instance(self, instance, ordering):
+        if not self._is_composite(ordering):
+            return super()._get_position_from_instance(instance, ordering)
+        value = super()._get_position_from_instance(instance, ordering)
+        pk = instance['id'] if isinstance(instance, dict) else instance.id
+        return f'{value}|{pk}'
+
+    def _position_filter(self, position, lookup):
+        if not self._is_composite(self.ordering):
+            return Q(**{f'{self.ordering[0].lstrip("-")}__{lookup}': position})
+        field = self.ordering[0].lstrip('-')
+        value, pk = position.rsplit('|', 1)
+        return Q(**{f'{field}__{lookup}': value}) | Q(**{
+            field: value, f'id__{lookup}': pk,
+        })
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # CursorPagination's, filtering through `_position_filter`
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            is_reversed = self.ordering[0].startswith('-')
+            # (cursor reversed) XOR (queryset reversed)
+            lookup = 'lt' if self.cursor.reverse != is_reversed else 'gt'
+            try:
+                queryset = queryset.filter(
+                    self._position_filter(current_position, lookup)
+                )
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        # one extra row tells whether a following page exists
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
@@ -0,0 +1,98 @@
+"""
+Full-text search over recipes
+
+On Postgres every recipe stores a weighted tsvector of its title, tag and
+ingredient names and description, indexed with GIN and ranked with
+ts_rank. Other databases fall back to case-insensitive substring matching
+of each search term, unranked.
+"""
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast
+
+from core.models import Recipe
+
+SEARCH_CONFIG = 'english'
+
+
+def is_ranked(using='default'):
+    """Whether searches on this database use the stored tsvector."""
+    return connections[using].vendor == 'postgresql'
+
+
+def _vector_sql(connection):
+    """SQL expression of a recipe's search vector, for alias `r`."""
+    qn = connection.ops.quote_name
+    parts = ["setweight(to_tsvector(%s, coalesce(r.title, '')), 'A')"]
+    for field_name in ('tags', 'ingredients'):
+        field = Recipe._meta.get_field(field_name)
+        through = field.remote_field.through._meta.db_table
+        related = field.related_model._meta.db_table
+        parts.append(
+            "setweight(to_tsvector(%s, coalesce(("
+            "SELECT string_agg(x.name, ' ') "
+            f"FROM {qn(through)} l JOIN {qn(related)} x "
+            f"ON x.id = l.{qn(field.m2m_reverse_name())} "
+            f"WHERE l.{qn(field.m2m_column_name())} = r.id"
+            "), '')), 'B')"
+        )
+    parts.append(
+        "setweight(to_tsvector(%s, coalesce(r.description, '')), 'C')"
+    )
+    return ' || '.join(parts), [SEARCH_CONFIG] * len(parts)
+
+
+def update_search_vectors(recipe_ids=None, using='default'):
+    """Recompute the stored search vector of the given recipes (or all).
+
+    Called in the same transaction as the write that changed the recipe's
+    text, tags or ingredients. A no-op on databases without tsvector.
+    """
+    if not is_ranked(using) or recipe_ids is not None and not recipe_ids:
+        return
+    connection = connections[using]
+    vector, params = _vector_sql(connection)
+    sql = (
+        f'UPDATE {connection.ops.quote_name(Recipe._meta.db_table)} AS r '
+        f'SET search_vector = {vector}'
+    )
+    if recipe_ids is not None:
+        sql += ' WHERE r.id = ANY(%s)'
+        params.append(list(recipe_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def _related_name_match(field_name, term):
+    # recipe ids linked to a tag or ingredient whose name contains `term`
+    field = Recipe._meta.get_field(field_name)
+    return Q(id__in=field.remote_field.through.objects.filter(**{
+        f'{field.m2m_reverse_field_name()}__name__icontains': term,
+    }).values(field.m2m_column_name()))
+
+
+def search_recipes(queryset, text):
+    """Filter `queryset` to recipes matching `text`.
+
+    On Postgres the rows are annotated with `search_rank` for ordering.
+    """
+    if is_ranked(queryset.db):
+        query = SearchQuery(
+            text, config=SEARCH_CONFIG, search_type='websearch'
+        )
+        # double precision, so the rank round-trips through a page cursor
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=Cast(
+                SearchRank(F('search_vector'), query), FloatField()
+            ),
+        )
+
+    for term in text.split():
+        queryset = queryset.filter(
+            Q(title__icontains=term) |
+            Q(description__icontains=term) |
+            _related_name_match('tags', term) |
+            _related_name_match('ingredients', term)
+        )
+    return queryset
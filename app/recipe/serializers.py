@@ -1,86 +1,404 @@
 
+from collections import OrderedDict
+
+from django.db import connection, transaction
+from django.db.models import OuterRef
 from rest_framework import serializers
 
 from core.models import Recipe, Tag, Ingredient
+from recipe.images import image_variant_urls, variant_urls
+from recipe.search import update_search_vectors
+
+
+def get_or_create_by_name(model, user, names):
+    """Return {name: obj} for `names`, inserting the missing ones in bulk.
+
+    The insert skips rows that hit the unique (user, name) constraint, so a
+    concurrent request creating the same name can't make this fail.
+    """
+    objs = {
+        obj.name: obj
+        for obj in model.objects.filter(user=user, name__in=names)
+    }
+
+    missing = [name for name in names if name not in objs]
+    if missing:
+        model.objects.bulk_create(
+            [model(user=user, name=name) for name in missing],
+            ignore_conflicts=True,
+        )
+        for obj in model.objects.filter(user=user, name__in=missing):
+            objs[obj.name] = obj
+
+    return objs
+
+
+def link_related(field_name, pairs):
+    """Insert (recipe_id, related_id) pairs into a recipe M2M in one query."""
+    field = Recipe._meta.get_field(field_name)
+    through = field.remote_field.through
+    recipe_column = field.m2m_column_name()
+    related_column = field.m2m_reverse_name()
+    through.objects.bulk_create([
+        through(**{recipe_column: recipe_id, related_column: related_id})
+        for recipe_id, related_id in pairs
+    ])
+
 
+def recipe_links(field_name):
+    """Rows of a recipe M2M table pointing at the outer tag or ingredient.
 
-class IngredientSerializer(serializers.ModelSerializer):
+    For Exists() and Subquery() on a Tag or Ingredient queryset.
+    """
+    field = Recipe._meta.get_field(field_name)
+    related_column = field.m2m_reverse_name()
+    return field.remote_field.through.objects.filter(
+        **{related_column: OuterRef('pk')}
+    ).order_by().values(related_column)
+
+
+class UniqueNameMixin:
+    """Reject renaming a tag or ingredient onto one the user already has."""
+
+    def validate_name(self, value):
+        if self.parent is not None:
+            # nested in a recipe payload, where names are get-or-created
+            return value
+        queryset = self.Meta.model.objects.filter(
+            user=self.context['request'].user, name=value,
+        )
+        if self.instance is not None:
+            queryset = queryset.exclude(pk=self.instance.pk)
+        if queryset.exists():
+            raise serializers.ValidationError(
+                f'{self.Meta.model.__name__} with this name already exists.'
+            )
+        return value
+
+
+class IngredientSerializer(UniqueNameMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Ingredient
         fields = ['id','name']
         read_only_fields = ['id']
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(UniqueNameMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ['id', 'name']
         read_only_fields = ['id']
 
-class RecipeSerializer(serializers.ModelSerializer):
+class IngredientUsageSerializer(IngredientSerializer):
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(IngredientSerializer.Meta):
+        fields = IngredientSerializer.Meta.fields + ['recipe_count']
+
+
+class TagUsageSerializer(TagSerializer):
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(TagSerializer.Meta):
+        fields = TagSerializer.Meta.fields + ['recipe_count']
+
+
+class RecipeListSerializer(serializers.ListSerializer):
+    """Create many recipes with one insert per table."""
+
+    def _link_all(self, recipes, field_name, model, item_lists):
+        auth_user = self.context['request'].user
+        names = list(dict.fromkeys(
+            item['name'] for items in item_lists for item in items
+        ))
+        objs = get_or_create_by_name(model, auth_user, names)
+        pairs = dict.fromkeys(
+            (recipe.id, objs[item['name']].id)
+            for recipe, items in zip(recipes, item_lists)
+            for item in items
+        )
+        link_related(field_name, pairs)
+
+    @transaction.atomic
+    def create(self, validated_data):
+        tag_lists = [item.pop('tags', []) for item in validated_data]
+        ingredient_lists = [
+            item.pop('ingredients', []) for item in validated_data
+        ]
+        recipes = [Recipe(**item) for item in validated_data]
+        if connection.features.can_return_rows_from_bulk_insert:
+            Recipe.objects.bulk_create(recipes)
+        else:
+            for recipe in recipes:
+                recipe.save()
+
+        self._link_all(recipes, 'tags', Tag, tag_lists)
+        self._link_all(recipes, 'ingredients', Ingredient, ingredient_lists)
+        update_search_vectors([recipe.id for recipe in recipes])
+        return recipes
+
+
+class SparseFieldsMixin:
+    """Trim the fields to the context's `fields` and collapse relations.
+
+    When the context carries `fields` or `expand`, fields not listed in
+    `fields` are dropped and nested relations not listed in `expand` are
+    rendered as lists of ids.
+    """
+    nested_fields = ['tags', 'ingredients']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get('fields')
+        expand = self.context.get('expand')
+        if fields is None and expand is None:
+            return
+
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        for name in self.nested_fields:
+            if name in self.fields and name not in (expand or ()):
+                self.fields[name] = serializers.PrimaryKeyRelatedField(
+                    many=True, read_only=True,
+                )
+
+
+class ImageVariantsMixin(serializers.Serializer):
+    image_variants = serializers.SerializerMethodField()
+
+    def get_image_variants(self, obj):
+        return variant_urls(obj, self.context.get('request'))
+
+
+class RecipeSerializer(
+    ImageVariantsMixin, SparseFieldsMixin, serializers.ModelSerializer
+):
     tags = TagSerializer(many=True, required=False)
     ingredients = IngredientSerializer(many=True, required=False)
 
     class Meta:
         model = Recipe
-        fields = ['id', 'title', 'time_minutes', 'price', 'link', 'tags', 'ingredients']
+        fields = [
+            'id', 'title', 'time_minutes', 'price', 'link', 'tags',
+            'ingredients', 'image_variants',
+        ]
         read_only_fields = ['id']
+        list_serializer_class = RecipeListSerializer
 
-    def _get_or_create_tags(self, tags, recipe):
+    def _set_related(self, recipe, field_name, model, items, replace=False):
+        # resolve every name at once and only touch the links that change
         auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag,
-            )
-            recipe.tags.add(tag_obj)
+        names = list(dict.fromkeys(item['name'] for item in items))
+        objs = get_or_create_by_name(model, auth_user, names)
+        wanted = {obj.id for obj in objs.values()}
 
-    def _get_or_create_ingredients(self, ingredients, recipe):
-        auth_user = self.context['request'].user
-        for ingredient in ingredients:
-            ingredient_obj, created = Ingredient.objects.get_or_create(
-                user=auth_user,
-                **ingredient
-            )
-            recipe.ingredients.add(ingredient_obj)
+        current = set()
+        if replace:
+            manager = getattr(recipe, field_name)
+            current = set(manager.values_list('id', flat=True))
+            stale = current - wanted
+            if stale:
+                manager.remove(*stale)
+
+        link_related(
+            field_name,
+            [(recipe.id, obj_id) for obj_id in wanted - current],
+        )
+
+    def _get_or_create_tags(self, tags, recipe, replace=False):
+        self._set_related(recipe, 'tags', Tag, tags, replace)
 
+    def _get_or_create_ingredients(self, ingredients, recipe, replace=False):
+        self._set_related(
+            recipe, 'ingredients', Ingredient, ingredients, replace
+        )
 
+    @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop('tags', [])
         ingredients = validated_data.pop('ingredients', [])
         recipe = Recipe.objects.create(**validated_data)
         self._get_or_create_tags(tags, recipe)
         self._get_or_create_ingredients(ingredients, recipe)
+        update_search_vectors([recipe.id])
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags = validated_data.pop('tags', None)
         ingredients = validated_data.pop('ingredients', None)
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            self._get_or_create_tags(tags, instance, replace=True)
 
         if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
+            self._get_or_create_ingredients(
+                ingredients, instance, replace=True
+            )
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
 
         instance.save()
+        update_search_vectors([instance.id])
         return instance
 
 
 
+class RecipeValuesListSerializer(serializers.ListSerializer):
+    """Build RecipeSerializer output straight from `.values()` rows.
+
+    The nested tags and ingredients are read with one query each as plain
+    (recipe id, id, name) tuples, so no model instances or per-row field
+    objects are created.
+    """
+
+    def _related(self, field_name, recipe_ids):
+        field = Recipe._meta.get_field(field_name)
+        recipe_column = field.m2m_column_name()
+        related_column = field.m2m_reverse_name()
+        rows = field.remote_field.through.objects.filter(
+            **{f'{recipe_column}__in': recipe_ids}
+        ).order_by(related_column).values_list(
+            recipe_column,
+            related_column,
+            f'{field.m2m_reverse_field_name()}__name',
+        )
+        related = {recipe_id: [] for recipe_id in recipe_ids}
+        for recipe_id, related_id, name in rows:
+            related[recipe_id].append(
+                OrderedDict([('id', related_id), ('name', name)])
+            )
+        return related
+
+    def to_representation(self, rows):
+        rows = list(rows)
+        recipe_ids = [row['id'] for row in rows]
+        tags = self._related('tags', recipe_ids)
+        ingredients = self._related('ingredients', recipe_ids)
+        price = self.child.fields['price']
+        request = self.context.get('request')
+        storage = Recipe._meta.get_field('image').storage
+        # columns a subclass adds are output as stored
+        extra = [
+            name for name in self.child.Meta.fields
+            if name not in RecipeSerializer.Meta.fields
+        ]
+        return [
+            OrderedDict([
+                ('id', row['id']),
+                ('title', row['title']),
+                ('time_minutes', row['time_minutes']),
+                ('price', price.to_representation(row['price'])),
+                ('link', row['link']),
+                ('tags', tags[row['id']]),
+                ('ingredients', ingredients[row['id']]),
+                ('image_variants', image_variant_urls(
+                    row['image'], row['image_status'], storage, request,
+                )),
+                *((name, row[name]) for name in extra),
+            ])
+            for row in rows
+        ]
+
+
+class RecipeValuesSerializer(RecipeSerializer):
+    """Read-only RecipeSerializer for querysets of `.values()` rows."""
+
+    class Meta(RecipeSerializer.Meta):
+        list_serializer_class = RecipeValuesListSerializer
+        value_fields = [
+            'id', 'title', 'time_minutes', 'price', 'link', 'image',
+            'image_status',
+        ]
+
+
+class RecipeExportSerializer(RecipeValuesSerializer):
+    """RecipeValuesSerializer with the description, for exports."""
+
+    class Meta(RecipeValuesSerializer.Meta):
+        fields = RecipeValuesSerializer.Meta.fields + ['description']
+        value_fields = RecipeValuesSerializer.Meta.value_fields + [
+            'description',
+        ]
+
+
+class IdListField(serializers.CharField):
+    """Comma separated ids in a query parameter, e.g. `?tags=1,4`."""
+    default_error_messages = {
+        'invalid_ids': 'Expected a comma separated list of ids.',
+    }
+
+    def to_internal_value(self, data):
+        value = super().to_internal_value(data)
+        try:
+            return [int(part) for part in value.split(',')]
+        except ValueError:
+            self.fail('invalid_ids')
+
+
+class RecipeListParamsSerializer(serializers.Serializer):
+    """Filters and ordering accepted by the recipe list."""
+    ORDERING_FIELDS = ['id', 'time_minutes', 'price']
+
+    tags = IdListField(required=False, allow_blank=True)
+    ingredients = IdListField(required=False, allow_blank=True)
+    match = serializers.ChoiceField(choices=['any', 'all'], required=False)
+    min_time = serializers.IntegerField(required=False, min_value=0)
+    max_time = serializers.IntegerField(required=False, min_value=0)
+    min_price = serializers.DecimalField(
+        max_digits=5, decimal_places=2, required=False, min_value=0,
+    )
+    max_price = serializers.DecimalField(
+        max_digits=5, decimal_places=2, required=False, min_value=0,
+    )
+    ordering = serializers.ChoiceField(
+        choices=ORDERING_FIELDS + [f'-{name}' for name in ORDERING_FIELDS],
+        required=False,
+    )
+
+
+class RecipeAttrParamsSerializer(serializers.Serializer):
+    """Filters accepted by the tag and ingredient lists."""
+    assigned_only = serializers.BooleanField(required=False, default=False)
+    with_usage = serializers.BooleanField(required=False, default=False)
+
+
+class RecipeBulkParamsSerializer(serializers.Serializer):
+    """Options accepted by the recipe bulk action."""
+    atomic = serializers.BooleanField(required=False, default=True)
+
+
+class RecipeImportSerializer(serializers.ModelSerializer):
+    """One row of a file loaded by `load_recipes`."""
+    user = serializers.EmailField(required=False, allow_blank=True)
+    tags = serializers.ListField(
+        child=serializers.CharField(max_length=255), required=False,
+    )
+    ingredients = serializers.ListField(
+        child=serializers.CharField(max_length=255), required=False,
+    )
+
+    class Meta:
+        model = Recipe
+        fields = [
+            'user', 'title', 'description', 'time_minutes', 'price', 'link',
+            'tags', 'ingredients',
+        ]
+
+
 class RecipeDetailSerializer(RecipeSerializer):
     class Meta(RecipeSerializer.Meta):
-        fields = RecipeSerializer.Meta.fields + ['description', 'image']
+        fields = RecipeSerializer.Meta.fields + [
+            'description', 'image', 'image_status',
+        ]
+        read_only_fields = ['id', 'image_status']
 
-class RecipeImageSerializer(serializers.ModelSerializer):
+class RecipeImageSerializer(ImageVariantsMixin, serializers.ModelSerializer):
     class Meta:
         model = Recipe
-        fields = ['id', 'image']
-        read_only_fields = ['id']
+        fields = ['id', 'image', 'image_status', 'image_variants']
+        read_only_fields = ['id', 'image_status']
         extra_kwargs = {'image': {'required': 'True'}} #FindOut: why required true
 
 
@@ -1,13 +1,17 @@
 
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from core.benchmark import seed_user_recipes
 from core.models import Ingredient, Recipe
+from core.tests.helpers import QueryCountMixin, query_budget
 
 from recipe.serializers import IngredientSerializer
 from decimal import Decimal
@@ -48,7 +52,7 @@ class PrivateIngredientsAPITests(TestCase):
         res = self.client.get(INGREDIENTS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_ingredient_limited_to_user(self):
         user2 = create_user("test2@test.com","password233")
@@ -58,9 +62,9 @@ class PrivateIngredientsAPITests(TestCase):
         res = self.client.get(INGREDIENTS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data),1)
-        self.assertEqual(res.data[0]['name'], ingredient.name)
-        self.assertEqual(res.data[0]['id'], ingredient.id)
+        self.assertEqual(len(res.data['results']),1)
+        self.assertEqual(res.data['results'][0]['name'], ingredient.name)
+        self.assertEqual(res.data['results'][0]['id'], ingredient.id)
 
 
     def test_update_ingredient(self):
@@ -109,4 +113,79 @@ class PrivateIngredientsAPITests(TestCase):
 
         res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data),1)
\ No newline at end of file
+        self.assertEqual(len(res.data['results']),1)
+
+    def test_assigned_only_uses_exists_without_distinct(self):
+        item = Ingredient.objects.create(user=self.user, name='Used')
+        Ingredient.objects.create(user=self.user, name='Unused')
+        for title in ('First', 'Second'):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=title,
+                time_minutes=10,
+                price=Decimal('1.00'),
+            )
+            recipe.ingredients.add(item)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
+
+        names = [row['name'] for row in res.data['results']]
+        self.assertEqual(names, ['Used'])
+        sql = ctx.captured_queries[-1]['sql']
+        self.assertIn('EXISTS', sql)
+        self.assertNotIn('DISTINCT', sql)
+
+    def test_with_usage_counts_recipes(self):
+        used = Ingredient.objects.create(user=self.user, name='Used')
+        Ingredient.objects.create(user=self.user, name='Unused')
+        for title in ('First', 'Second'):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=title,
+                time_minutes=10,
+                price=Decimal('1.00'),
+            )
+            recipe.ingredients.add(used)
+
+        res = self.client.get(INGREDIENTS_URL, {'with_usage': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        counts = {
+            row['name']: row['recipe_count'] for row in res.data['results']
+        }
+        self.assertEqual(counts, {'Used': 2, 'Unused': 0})
+
+
+@query_budget('IngredientViewSet.list', 2, time_ms=250)
+@query_budget('IngredientViewSet.partial_update', 13)
+class IngredientQueryBudgetTests(QueryCountMixin, TestCase):
+    """Query budgets of the ingredient endpoints at 1, 10 and 100 recipes."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def populate(self, size):
+        seed_user_recipes(self.user, size, tags=5, ingredients=5)
+        self.ingredient = Ingredient.objects.filter(
+            user=self.user,
+        ).latest('id')
+
+    def test_list(self):
+        self.assertWithinBudget(
+            'IngredientViewSet.list',
+            lambda: self.client.get(INGREDIENTS_URL, {'with_usage': 1}),
+            self.populate,
+        )
+
+    def test_partial_update(self):
+        self.assertWithinBudget(
+            'IngredientViewSet.partial_update',
+            lambda: self.client.patch(
+                detail_url(self.ingredient.id),
+                {'name': f'Renamed {self.ingredient.id}'},
+            ),
+            self.populate,
+        )
@@ -1,19 +1,35 @@
 
 
+import base64
+import csv
+import io
+import json
 from decimal import Decimal
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import patch
 import tempfile
 import os
+import shutil
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Recipe, Tag, Ingredient
+from core.benchmark import seed_user_recipes
+from core.tests.helpers import QueryCountMixin, query_budget
+
+from recipe.cache import list_cache
+from recipe.images import VARIANTS, process_recipe_image, variant_path
 
 from recipe.serializers import (
     RecipeSerializer,
@@ -22,6 +38,9 @@ from recipe.serializers import (
 )
 
 RECIPE_URL = reverse('recipe:recipe-list')
+BULK_URL = reverse('recipe:recipe-bulk')
+CHANGES_URL = reverse('recipe:recipe-changes')
+EXPORT_URL = reverse('recipe:recipe-export')
 
 def get_recipe_detail(id):
     return reverse('recipe:recipe-detail',args=[id])
@@ -76,7 +95,7 @@ class PrivateRecipeAPITests(TestCase):
         recipes = Recipe.objects.all().order_by('-id')
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipe_list_limited_to_user(self):
         other_user = create_user(
@@ -91,7 +110,7 @@ class PrivateRecipeAPITests(TestCase):
         recipes = Recipe.objects.filter(user=self.user)
         serializer = RecipeSerializer(recipes, many = True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
 
     def test_get_recipe_detail(self):
@@ -244,8 +263,7 @@ class PrivateRecipeAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(recipe.tags.count(),1)
         self.assertTrue(recipe.tags.filter(name=payload['tags'][0]['name'], user=self.user).exists())
-        new_tag = Tag.objects.create(user=self.user, name='Lunch')
-        self.assertTrue(Tag.objects.count(), 1)
+        self.assertEqual(Tag.objects.filter(name='Lunch').count(), 1)
 
     def test_update_recipe_assign_tag(self):
 
@@ -277,6 +295,56 @@ class PrivateRecipeAPITests(TestCase):
         self.assertEqual(recipe.tags.count(), 0)
 
 
+    def test_create_recipe_with_many_tags_batches_queries(self):
+        Tag.objects.create(user=self.user, name='tag 0')
+        payload = {
+            'title': 'Feast',
+            'time_minutes': 120,
+            'price': Decimal('30.00'),
+            'tags': [{'name': f'tag {i}'} for i in range(20)],
+            'ingredients': [{'name': f'ing {i}'} for i in range(30)],
+        }
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertLess(len(ctx.captured_queries), 20)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.count(), 20)
+        self.assertEqual(recipe.ingredients.count(), 30)
+        self.assertEqual(Tag.objects.filter(name='tag 0').count(), 1)
+
+    def test_update_tags_only_touches_changed_links(self):
+        keep = Tag.objects.create(user=self.user, name='Keep')
+        drop = Tag.objects.create(user=self.user, name='Drop')
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(keep, drop)
+        through = Recipe.tags.through
+        kept_link = through.objects.get(recipe=recipe, tag=keep)
+
+        payload = {'tags': [{'name': 'Keep'}, {'name': 'New'}]}
+        url = get_recipe_detail(recipe.id)
+        res = self.client.patch(url, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(through.objects.filter(id=kept_link.id).exists())
+        names = set(recipe.tags.values_list('name', flat=True))
+        self.assertEqual(names, {'Keep', 'New'})
+
+    def test_duplicate_tag_names_are_linked_once(self):
+        payload = {
+            'title': 'Toast',
+            'time_minutes': 5,
+            'price': Decimal('1.00'),
+            'tags': [{'name': 'Quick'}, {'name': 'Quick'}],
+        }
+        res = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.count(), 1)
+
     def test_create_recipe_with_new_ingredient(self):
 
         payload = {
@@ -384,9 +452,9 @@ class PrivateRecipeAPITests(TestCase):
         s1 = RecipeSerializer(r1)
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
 
     def test_filter_by_ingredients(self):
 
@@ -407,9 +475,1146 @@ class PrivateRecipeAPITests(TestCase):
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
 
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
+
+class BulkRecipeAPITests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+
+    def _payload(self, title, **params):
+        payload = {
+            'title': title,
+            'time_minutes': 10,
+            'price': '2.50',
+        }
+        payload.update(params)
+        return payload
+
+    def test_bulk_create(self):
+        Tag.objects.create(user=self.user, name='Vegan')
+        payload = [
+            self._payload('Salad', tags=[{'name': 'Vegan'}]),
+            self._payload(
+                'Soup',
+                tags=[{'name': 'Vegan'}, {'name': 'Winter'}],
+                ingredients=[{'name': 'Leek'}],
+            ),
+        ]
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        results = res.data['results']
+        self.assertEqual([r['status'] for r in results], [201, 201])
+        soup = Recipe.objects.get(id=results[1]['data']['id'])
+        self.assertEqual(soup.user, self.user)
+        self.assertEqual(soup.tags.count(), 2)
+        self.assertEqual(soup.ingredients.get().name, 'Leek')
+        self.assertEqual(Tag.objects.filter(name='Vegan').count(), 1)
+        self.assertEqual(results[0]['data']['tags'][0]['name'], 'Vegan')
+
+    def test_bulk_create_atomic_rejects_whole_batch(self):
+        payload = [self._payload('Salad'), {'title': 'No price'}]
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        results = res.data['results']
+        self.assertEqual(results[0]['status'], 424)
+        self.assertEqual(results[1]['status'], 400)
+        self.assertIn('price', results[1]['errors'])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_create_partial_success(self):
+        payload = [self._payload('Salad'), {'title': 'No price'}]
+        res = self.client.post(
+            BULK_URL + '?atomic=0', payload, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        results = res.data['results']
+        self.assertEqual([r['status'] for r in results], [201, 400])
+        self.assertEqual(
+            Recipe.objects.get(user=self.user).title, 'Salad'
+        )
+
+    def test_bulk_atomic_accepts_boolean_words(self):
+        payload = [self._payload('Salad'), {'title': 'No price'}]
+        res = self.client.post(
+            BULK_URL + '?atomic=false', payload, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+
+    def test_bulk_invalid_atomic_flag(self):
+        res = self.client.post(
+            BULK_URL + '?atomic=maybe', [self._payload('Salad')],
+            format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('atomic', res.data)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_update(self):
+        r1 = create_recipe(user=self.user, title='Old 1')
+        r2 = create_recipe(user=self.user, title='Old 2')
+        payload = [
+            {'id': r1.id, 'title': 'New 1', 'tags': [{'name': 'Quick'}]},
+            {'id': r2.id, 'time_minutes': 99},
+        ]
+        res = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        r1.refresh_from_db()
+        r2.refresh_from_db()
+        self.assertEqual(r1.title, 'New 1')
+        self.assertEqual(r2.time_minutes, 99)
+        results = res.data['results']
+        self.assertEqual(results[0]['data']['tags'][0]['name'], 'Quick')
+
+    def test_bulk_update_other_users_recipe_not_found(self):
+        other = create_user('other@example.com', 'password123')
+        mine = create_recipe(user=self.user, title='Mine')
+        theirs = create_recipe(user=other, title='Theirs')
+        payload = [
+            {'id': mine.id, 'title': 'Changed'},
+            {'id': theirs.id, 'title': 'Changed'},
+        ]
+        res = self.client.patch(
+            BULK_URL + '?atomic=0', payload, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(
+            [r['status'] for r in res.data['results']], [200, 404]
+        )
+        theirs.refresh_from_db()
+        self.assertEqual(theirs.title, 'Theirs')
+
+    def test_bulk_delete(self):
+        r1 = create_recipe(user=self.user)
+        r2 = create_recipe(user=self.user)
+        keep = create_recipe(user=self.user)
+        res = self.client.delete(BULK_URL, [r1.id, r2.id], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            list(Recipe.objects.values_list('id', flat=True)), [keep.id]
+        )
+
+    def test_bulk_delete_atomic_missing_id(self):
+        recipe = create_recipe(user=self.user)
+        res = self.client.delete(
+            BULK_URL, [recipe.id, recipe.id + 100], format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Recipe.objects.filter(id=recipe.id).exists())
+
+    def test_bulk_delete_rejects_boolean_ids(self):
+        recipe = create_recipe(user=self.user)
+        res = self.client.delete(
+            BULK_URL + '?atomic=0', [True, recipe.id + 100], format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(
+            [r['status'] for r in res.data['results']], [400, 404]
+        )
+        self.assertTrue(Recipe.objects.filter(id=recipe.id).exists())
+
+    def test_bulk_update_rejects_boolean_id(self):
+        recipe = create_recipe(user=self.user, title='Kept')
+        res = self.client.patch(
+            BULK_URL + '?atomic=0', [{'id': True, 'title': 'Changed'}],
+            format='json',
+        )
+
+        self.assertEqual(res.data['results'][0]['status'], 400)
+        self.assertIn('id', res.data['results'][0]['errors'])
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Kept')
+
+    def test_bulk_requires_list(self):
+        res = self.client.post(
+            BULK_URL, self._payload('Salad'), format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipeExportTests(QueryCountMixin, TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+
+    def export(self, **params):
+        res = self.client.get(EXPORT_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        return res, b''.join(res.streaming_content).decode()
+
+    @override_settings(RECIPE_EXPORT_CHUNK_SIZE=2)
+    def test_export_ndjson(self):
+        recipes = [
+            create_recipe(user=self.user, title=f'Recipe {i}')
+            for i in range(5)
+        ]
+        recipes[0].tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        other = create_user('other@example.com', 'testpass123')
+        create_recipe(user=other, title='Not mine')
+
+        res, content = self.export()
+
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        self.assertIn('recipes.ndjson', res['Content-Disposition'])
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(
+            [row['title'] for row in rows], [f'Recipe {i}' for i in range(5)],
+        )
+        self.assertEqual(rows[0]['tags'][0]['name'], 'Vegan')
+        self.assertEqual(rows[0]['description'], 'Sample Description')
+        self.assertEqual(rows[0]['price'], '5.25')
+
+    def test_export_csv_loads_back(self):
+        recipe = create_recipe(user=self.user, title='Stew')
+        recipe.tags.add(
+            Tag.objects.create(user=self.user, name='Winter'),
+            Tag.objects.create(user=self.user, name='Hearty'),
+        )
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Beef')
+        )
+
+        res, content = self.export(export_format='csv')
+
+        self.assertEqual(res['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['tags'], 'Winter|Hearty')
+
+        other = create_user('other@example.com', 'testpass123')
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'recipes.csv')
+        with open(path, 'w') as export_file:
+            export_file.write(content)
+        call_command(
+            'load_recipes', path, user=other.email, stdout=StringIO(),
+        )
+        copy = Recipe.objects.get(user=other)
+        self.assertEqual(copy.title, 'Stew')
+        self.assertEqual(
+            sorted(copy.tags.values_list('name', flat=True)),
+            ['Hearty', 'Winter'],
+        )
+
+    def test_export_empty_csv_has_header(self):
+        _, content = self.export(export_format='csv')
+
+        self.assertTrue(content.startswith('id,title,'))
+        self.assertEqual(len(content.splitlines()), 1)
+
+    def test_export_invalid_format(self):
+        res = self.client.get(EXPORT_URL, {'export_format': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(RECIPE_EXPORT_CHUNK_SIZE=1000)
+    def test_export_query_count_is_constant(self):
+        def populate(size):
+            seed_user_recipes(self.user, size, tags=5, ingredients=5)
+
+        def export():
+            b''.join(self.client.get(EXPORT_URL).streaming_content)
+
+        self.assertConstantQueries(export, populate)
+
+
+class RecipeChangesTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+
+    def _sync(self, since=None, **params):
+        if since is not None:
+            params['since'] = since
+        res = self.client.get(CHANGES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def _ids(self, data):
+        return [item['id'] for item in data['results']]
+
+    def _create(self, title):
+        res = self.client.post(RECIPE_URL, {
+            'title': title, 'time_minutes': 5, 'price': '1.00',
+        })
+        return res.data['id']
+
+    def test_full_sync_then_nothing(self):
+        first = self._create('First')
+        second = self._create('Second')
+
+        data = self._sync()
+        self.assertEqual(self._ids(data), [first, second])
+        self.assertEqual(data['deleted'], [])
+        self.assertFalse(data['has_more'])
+
+        self.assertEqual(self._sync(data['cursor'])['results'], [])
+
+    def test_only_changes_since_cursor(self):
+        first = self._create('First')
+        second = self._create('Second')
+        cursor = self._sync()['cursor']
+
+        self.client.patch(get_recipe_detail(first), {'title': 'Renamed'})
+        data = self._sync(cursor)
+
+        self.assertEqual(self._ids(data), [first])
+        self.assertEqual(data['results'][0]['title'], 'Renamed')
+        self.assertNotIn(second, self._ids(data))
+
+    def test_deletions_returned_as_tombstones(self):
+        first = self._create('First')
+        second = self._create('Second')
+        third = self._create('Third')
+        cursor = self._sync()['cursor']
+
+        self.client.delete(get_recipe_detail(first))
+        self.client.delete(BULK_URL, [second], format='json')
+        data = self._sync(cursor)
+
+        self.assertEqual(data['results'], [])
+        self.assertEqual(data['deleted'], [first, second])
+        self.assertNotIn(third, data['deleted'])
+
+    def test_tag_rename_marks_recipes_changed(self):
+        recipe_id = self._create('Tagged')
+        recipe = Recipe.objects.get(id=recipe_id)
+        tag = Tag.objects.create(user=self.user, name='Old')
+        recipe.tags.add(tag)
+        cursor = self._sync()['cursor']
+
+        self.client.patch(
+            reverse('recipe:tag-detail', args=[tag.id]), {'name': 'New'},
+        )
+        data = self._sync(cursor)
+
+        self.assertEqual(self._ids(data), [recipe_id])
+
+    def test_bulk_created_recipes_paged_within_one_seq(self):
+        res = self.client.post(BULK_URL, [
+            {'title': f'Recipe {i}', 'time_minutes': 5, 'price': '1.00'}
+            for i in range(5)
+        ], format='json')
+        created = [item['data']['id'] for item in res.data['results']]
+
+        seen = []
+        data = self._sync(page_size=2)
+        seen.extend(self._ids(data))
+        while data['has_more']:
+            data = self._sync(data['cursor'], page_size=2)
+            seen.extend(self._ids(data))
+
+        self.assertEqual(seen, sorted(created))
+        self.assertEqual(
+            len(set(Recipe.objects.values_list('change_seq', flat=True))), 1
+        )
+
+    def test_unnumbered_writes_picked_up(self):
+        cursor = self._sync()['cursor']
+        recipe = create_recipe(user=self.user)
+
+        data = self._sync(cursor)
+
+        self.assertEqual(self._ids(data), [recipe.id])
+        recipe.refresh_from_db()
+        self.assertIsNotNone(recipe.change_seq)
+
+    def test_other_users_changes_hidden(self):
+        other = create_user('other@example.com', 'testpass123')
+        create_recipe(user=other)
+
+        self.assertEqual(self._sync()['results'], [])
+
+    def test_invalid_cursor_rejected(self):
+        res = self.client.get(CHANGES_URL, {'since': 'yesterday'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+
+    def test_detail_not_modified_with_matching_etag(self):
+        url = get_recipe_detail(self.recipe.id)
+        res = self.client.get(url)
+        self.assertIn('ETag', res)
+        self.assertIn('Last-Modified', res)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_not_modified_since_last_modified(self):
+        url = get_recipe_detail(self.recipe.id)
+        last_modified = self.client.get(url)['Last-Modified']
+
+        res = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_non_numeric_id_not_found(self):
+        res = self.client.get(RECIPE_URL + 'abc/')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_detail_etag_changes_on_update(self):
+        url = get_recipe_detail(self.recipe.id)
+        etag = self.client.get(url)['ETag']
+
+        self.client.patch(url, {'title': 'Changed'})
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'Changed')
+
+    def test_detail_etag_changes_on_tag_rename(self):
+        tag = Tag.objects.create(user=self.user, name='Old')
+        self.recipe.tags.add(tag)
+        url = get_recipe_detail(self.recipe.id)
+        etag = self.client.get(url)['ETag']
+
+        tag_url = reverse('recipe:tag-detail', args=[tag.id])
+        self.client.patch(tag_url, {'name': 'New'})
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'][0]['name'], 'New')
+
+    def test_list_not_modified_with_matching_etag(self):
+        etag = self.client.get(RECIPE_URL)['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_not_modified_since_last_modified(self):
+        last_modified = self.client.get(RECIPE_URL)['Last-Modified']
+
+        res = self.client.get(RECIPE_URL, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_etag_changes_on_create_and_filter(self):
+        etag = self.client.get(RECIPE_URL)['ETag']
+        filtered = self.client.get(RECIPE_URL, {'tags': '1'})['ETag']
+        self.assertNotEqual(etag, filtered)
+
+        payload = {'title': 'New', 'time_minutes': 5, 'price': '1.00'}
+        self.client.post(RECIPE_URL, payload, format='json')
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 2)
+
+
+@override_settings(RECIPE_LIST_CACHE_ENABLED=False)
+class SparseFieldsTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user, name='Kale'
+        )
+        self.recipe.tags.add(self.tag)
+        self.recipe.ingredients.add(self.ingredient)
+
+    def test_fields_trims_list_output_and_query(self):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPE_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['results'],
+            [{'id': self.recipe.id, 'title': self.recipe.title}],
+        )
+        recipe_sql = [
+            q['sql'] for q in ctx.captured_queries
+            if 'FROM "core_recipe"' in q['sql']
+        ]
+        self.assertNotIn('"link"', recipe_sql[-1])
+        self.assertFalse(any(
+            'core_tag' in q['sql'] for q in ctx.captured_queries
+        ))
+
+    def test_unexpanded_relations_collapse_to_ids(self):
+        url = get_recipe_detail(self.recipe.id)
+        res = self.client.get(url, {'fields': 'id,tags,ingredients'})
+
+        self.assertEqual(res.data, {
+            'id': self.recipe.id,
+            'tags': [self.tag.id],
+            'ingredients': [self.ingredient.id],
+        })
+
+    def test_expand_returns_nested_objects(self):
+        url = get_recipe_detail(self.recipe.id)
+        res = self.client.get(url, {'expand': 'tags'})
+
+        self.assertEqual(
+            res.data['tags'], [{'id': self.tag.id, 'name': 'Vegan'}]
+        )
+        self.assertEqual(res.data['ingredients'], [self.ingredient.id])
+        self.assertEqual(res.data['description'], self.recipe.description)
+
+    def test_unknown_field_is_rejected(self):
+        res = self.client.get(RECIPE_URL, {'fields': 'id,secret'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_detail_only_fields_not_in_list(self):
+        res = self.client.get(RECIPE_URL, {'fields': 'description'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipePaginationTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+        self.recipes = [
+            create_recipe(user=self.user, title=f'Recipe {i}')
+            for i in range(5)
+        ]
+
+    def test_list_is_paginated_by_cursor(self):
+        res = self.client.get(RECIPE_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', res.data)
+        self.assertIsNone(res.data['previous'])
+        ids = [item['id'] for item in res.data['results']]
+        self.assertEqual(ids, [self.recipes[4].id, self.recipes[3].id])
+
+    def test_next_cursor_walks_all_recipes(self):
+        seen = []
+        url = RECIPE_URL + '?page_size=2'
+        while url:
+            res = self.client.get(url)
+            seen.extend(item['id'] for item in res.data['results'])
+            url = res.data['next']
+
+        expected = [recipe.id for recipe in reversed(self.recipes)]
+        self.assertEqual(seen, expected)
+
+    @override_settings(API_MAX_PAGE_SIZE=3)
+    def test_page_size_is_capped(self):
+        res = self.client.get(RECIPE_URL, {'page_size': 100})
+
+        self.assertEqual(len(res.data['results']), 3)
+
+    def test_deep_page_skips_count_query(self):
+        res = self.client.get(RECIPE_URL, {'page_size': 2})
+        res = self.client.get(res.data['next'])
+
+        with self.assertNumQueries(4):
+            self.client.get(res.data['next'])
+
+
+class RecipeListCacheTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user, title='Cached')
+
+    def test_second_list_is_served_from_cache(self):
+        self.client.get(RECIPE_URL)
+        hits = list_cache.stats()['hits']
+
+        # only the collection version lookup for the ETag
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.data['results'][0]['title'], 'Cached')
+        self.assertEqual(list_cache.stats()['hits'], hits + 1)
+
+    def test_filters_are_cached_separately(self):
+        tag = Tag.objects.create(user=self.user, name='Tagged')
+        self.recipe.tags.add(tag)
+        create_recipe(user=self.user, title='Untagged')
+
+        res_all = self.client.get(RECIPE_URL)
+        res_tagged = self.client.get(RECIPE_URL, {'tags': tag.id})
+
+        self.assertEqual(len(res_all.data['results']), 2)
+        self.assertEqual(len(res_tagged.data['results']), 1)
+
+    def test_create_invalidates_list(self):
+        self.client.get(RECIPE_URL)
+        payload = {'title': 'Fresh', 'time_minutes': 5, 'price': '1.00'}
+        self.client.post(RECIPE_URL, payload, format='json')
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.data['results'][0]['title'], 'Fresh')
+
+    def test_update_and_delete_invalidate_list(self):
+        self.client.get(RECIPE_URL)
+        url = get_recipe_detail(self.recipe.id)
+        self.client.patch(url, {'title': 'Renamed'})
+
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res.data['results'][0]['title'], 'Renamed')
+
+        self.client.delete(url)
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res.data['results'], [])
+
+    def test_write_by_another_process_invalidates_list(self):
+        # another worker only shares the database, not this cache
+        first = self.client.get(RECIPE_URL)
+        Recipe.objects.filter(id=self.recipe.id).update(title='Elsewhere')
+        self.user.bump_recipes_version()
+
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['title'], 'Elsewhere')
+
+    def test_cache_is_per_user(self):
+        self.client.get(RECIPE_URL)
+        other = create_user('other@example.com', 'password123')
+        self.client.force_authenticate(other)
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    @override_settings(RECIPE_LIST_CACHE_TIMEOUT=0)
+    def test_entries_expire_after_timeout(self):
+        self.client.get(RECIPE_URL)
+        Recipe.objects.filter(id=self.recipe.id).update(title='Expired')
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.data['results'][0]['title'], 'Expired')
+
+
+@override_settings(RECIPE_LIST_CACHE_ENABLED=False)
+class RecipeListFastPathTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('Vegan', 'Café', 'Quick')
+        ]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ('Salt', 'Pepper')
+        ]
+        for i, price in enumerate(['0.50', '100.00', '999.99', '7.10']):
+            recipe = create_recipe(
+                user=self.user,
+                title=f'Recipe {i} ü',
+                price=Decimal(price),
+                link='' if i % 2 else f'https://example.com/{i}',
+            )
+            recipe.tags.add(*tags[i % 3:])
+            recipe.ingredients.add(*ingredients[:i % 3])
+        recipe.image = 'uploads/recipe/photo.jpg'
+        recipe.image_status = 'ready'
+        recipe.save()
+
+    def _content(self, fast_path, params=None):
+        with self.settings(RECIPE_LIST_FAST_PATH=fast_path):
+            res = self.client.get(RECIPE_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.content
+
+    def test_output_is_byte_identical(self):
+        self.assertEqual(self._content(True), self._content(False))
+
+    def test_paginated_output_is_byte_identical(self):
+        params = {'page_size': 2}
+        self.assertEqual(
+            self._content(True, params), self._content(False, params)
+        )
+
+    def test_matches_recipe_serializer(self):
+        res = self.client.get(RECIPE_URL)
+
+        recipes = Recipe.objects.filter(user=self.user).order_by('-id')
+        serializer = RecipeSerializer(
+            recipes, many=True, context={'request': res.wsgi_request},
+        )
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def test_thumbnail_urls_listed(self):
+        res = self.client.get(RECIPE_URL)
+
+        variants = res.data['results'][0]['image_variants']
+        self.assertEqual(
+            variants['thumbnail'],
+            'http://testserver/static/media/uploads/recipe/variants/photo/'
+            'thumbnail.jpg',
+        )
+        self.assertTrue(variants['thumbnail_webp'].endswith('.webp'))
+        self.assertEqual(res.data['results'][1]['image_variants'], {})
+
+    def test_fast_path_query_count(self):
+        # version lookup, page of rows, tags, ingredients
+        with self.assertNumQueries(4):
+            self.client.get(RECIPE_URL)
+
+
+@override_settings(RECIPE_LIST_CACHE_ENABLED=False)
+class RecipeQueryCountTests(QueryCountMixin, TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+
+    def _populate(self, size):
+        for i in range(Recipe.objects.filter(user=self.user).count(), size):
+            recipe = create_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f'tag {i}'),
+                Tag.objects.create(user=self.user, name=f'extra {i}'),
+            )
+            recipe.ingredients.add(
+                Ingredient.objects.create(user=self.user, name=f'ing {i}')
+            )
+
+    def test_list_query_count_is_constant(self):
+        self.assertConstantQueries(
+            lambda: self.client.get(RECIPE_URL),
+            self._populate,
+        )
+
+    def test_filtered_list_query_count_is_constant(self):
+        tag = Tag.objects.create(user=self.user, name='Shared')
+
+        def populate(size):
+            self._populate(size)
+            for recipe in Recipe.objects.filter(user=self.user):
+                recipe.tags.add(tag)
+
+        self.assertConstantQueries(
+            lambda: self.client.get(RECIPE_URL, {'tags': tag.id}),
+            populate,
+        )
+
+    def test_detail_prefetches_relations(self):
+        self._populate(1)
+        recipe = Recipe.objects.get(user=self.user)
+        url = get_recipe_detail(recipe.id)
+
+        with self.assertNumQueries(4):
+            res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['tags']), 2)
+
+
+@query_budget('RecipeViewSet.list', 4, time_ms=250)
+@query_budget('RecipeViewSet.retrieve', 4, time_ms=250)
+@query_budget('RecipeViewSet.create', 17)
+@query_budget('RecipeViewSet.partial_update', 18)
+@query_budget('RecipeViewSet.destroy', 13)
+@query_budget('RecipeViewSet.changes', 6, time_ms=250)
+@query_budget('RecipeViewSet.bulk', 13)
+@query_budget('RecipeViewSet.upload_image', 8)
+@query_budget('RecipeViewSet.export', 3, time_ms=250)
+@override_settings(RECIPE_LIST_CACHE_ENABLED=False)
+class RecipeQueryBudgetTests(QueryCountMixin, TestCase):
+    """Query budgets of the recipe endpoints at 1, 10 and 100 recipes."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+
+    def populate(self, size):
+        seed_user_recipes(self.user, size, tags=5, ingredients=5)
+        self.recipe_id = Recipe.objects.filter(user=self.user).latest('id').id
+
+    def test_list(self):
+        self.assertWithinBudget(
+            'RecipeViewSet.list',
+            lambda: self.client.get(RECIPE_URL),
+            self.populate,
+        )
+
+    def test_retrieve(self):
+        self.assertWithinBudget(
+            'RecipeViewSet.retrieve',
+            lambda: self.client.get(
+                get_recipe_detail(self.recipe_id)
+            ),
+            self.populate,
+        )
+
+    def test_create(self):
+        payload = {
+            'title': 'Budget',
+            'time_minutes': 10,
+            'price': '2.50',
+            'tags': [{'name': 'tag 0'}, {'name': 'New tag'}],
+            'ingredients': [{'name': 'ingredient 0'}],
+        }
+        self.assertWithinBudget(
+            'RecipeViewSet.create',
+            lambda: self.client.post(RECIPE_URL, payload, format='json'),
+            self.populate,
+        )
+
+    def test_partial_update(self):
+        self.assertWithinBudget(
+            'RecipeViewSet.partial_update',
+            lambda: self.client.patch(
+                get_recipe_detail(self.recipe_id),
+                {'title': 'Renamed', 'tags': [{'name': 'tag 1'}]},
+                format='json',
+            ),
+            self.populate,
+        )
+
+    def test_destroy(self):
+        self.assertWithinBudget(
+            'RecipeViewSet.destroy',
+            lambda: self.client.delete(
+                get_recipe_detail(self.recipe_id)
+            ),
+            self.populate,
+        )
+
+    def test_changes(self):
+        self.assertWithinBudget(
+            'RecipeViewSet.changes',
+            lambda: self.client.get(CHANGES_URL, {'since': 0}),
+            self.populate,
+        )
+
+    def test_bulk_create(self):
+        payload = [
+            {'title': f'Bulk {i}', 'time_minutes': 5, 'price': '1.00'}
+            for i in range(3)
+        ]
+        self.assertWithinBudget(
+            'RecipeViewSet.bulk',
+            lambda: self.client.post(BULK_URL, payload, format='json'),
+            self.populate,
+        )
+
+    def test_export(self):
+        def export():
+            res = self.client.get(EXPORT_URL)
+            b''.join(res.streaming_content)
+            return res
+
+        self.assertWithinBudget('RecipeViewSet.export', export, self.populate)
+
+    def test_upload_image(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+
+        def upload():
+            image = io.BytesIO()
+            Image.new('RGB', (10, 10)).save(image, format='JPEG')
+            image.name = 'budget.jpg'
+            image.seek(0)
+            return self.client.post(
+                image_upload_url(self.recipe_id),
+                {'image': image}, format='multipart',
+            )
+
+        with self.settings(MEDIA_ROOT=media_root):
+            self.assertWithinBudget(
+                'RecipeViewSet.upload_image', upload, self.populate,
+            )
+
+
+class RecipeFilterTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+        self.tags = [
+            Tag.objects.create(user=self.user, name=f'tag {i}')
+            for i in range(3)
+        ]
+        self.ingredients = [
+            Ingredient.objects.create(user=self.user, name=f'ing {i}')
+            for i in range(4)
+        ]
+
+    def _ids(self, objs):
+        return ','.join(str(obj.id) for obj in objs)
+
+    def test_multi_match_returns_recipe_once(self):
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(*self.tags)
+        recipe.ingredients.add(*self.ingredients)
+
+        res = self.client.get(RECIPE_URL, {
+            'tags': self._ids(self.tags),
+            'ingredients': self._ids(self.ingredients),
+        })
+
+        ids = [item['id'] for item in res.data['results']]
+        self.assertEqual(ids, [recipe.id])
+
+    def test_match_all_requires_every_tag(self):
+        full = create_recipe(user=self.user, title='Full')
+        full.tags.add(*self.tags)
+        partial = create_recipe(user=self.user, title='Partial')
+        partial.tags.add(self.tags[0])
+
+        res_any = self.client.get(RECIPE_URL, {'tags': self._ids(self.tags)})
+        res_all = self.client.get(
+            RECIPE_URL, {'tags': self._ids(self.tags), 'match': 'all'}
+        )
+
+        any_ids = {item['id'] for item in res_any.data['results']}
+        all_ids = [item['id'] for item in res_all.data['results']]
+        self.assertEqual(any_ids, {full.id, partial.id})
+        self.assertEqual(all_ids, [full.id])
+
+    def test_match_all_combines_tags_and_ingredients(self):
+        match = create_recipe(user=self.user, title='Match')
+        match.tags.add(self.tags[0])
+        match.ingredients.add(*self.ingredients[:2])
+        other = create_recipe(user=self.user, title='Other')
+        other.tags.add(self.tags[0])
+        other.ingredients.add(self.ingredients[0])
+
+        res = self.client.get(RECIPE_URL, {
+            'tags': self._ids(self.tags[:1]),
+            'ingredients': self._ids(self.ingredients[:2]),
+            'match': 'all',
+        })
+
+        ids = [item['id'] for item in res.data['results']]
+        self.assertEqual(ids, [match.id])
+
+    def test_invalid_ids_rejected(self):
+        for params in ({'tags': 'abc'}, {'ingredients': '1,,2'}):
+            res = self.client.get(RECIPE_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(next(iter(params)), res.data)
+
+    def test_invalid_match_rejected(self):
+        res = self.client.get(
+            RECIPE_URL, {'tags': self._ids(self.tags), 'match': 'every'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('match', res.data)
+
+
+class RecipeRangeOrderingTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+        self.recipes = [
+            create_recipe(
+                user=self.user, title=f'Recipe {i}',
+                time_minutes=[10, 30, 10, 60, 10][i],
+                price=Decimal(['4.00', '2.50', '9.99', '2.50', '7.25'][i]),
+            )
+            for i in range(5)
+        ]
+
+    def _ids(self, params):
+        res = self.client.get(RECIPE_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [item['id'] for item in res.data['results']]
+
+    def _walk(self, params):
+        seen = []
+        res = self.client.get(RECIPE_URL, {**params, 'page_size': 2})
+        while True:
+            seen.extend(item['id'] for item in res.data['results'])
+            if not res.data['next']:
+                return seen
+            res = self.client.get(res.data['next'])
+
+    def test_time_range(self):
+        ids = self._ids({'min_time': 20, 'max_time': 60})
+
+        self.assertEqual(ids, [self.recipes[3].id, self.recipes[1].id])
+
+    def test_price_range(self):
+        ids = self._ids({'min_price': '2.50', 'max_price': '5'})
+
+        self.assertEqual(
+            ids,
+            [self.recipes[3].id, self.recipes[1].id, self.recipes[0].id],
+        )
+
+    def test_invalid_range_rejected(self):
+        res = self.client.get(RECIPE_URL, {'max_time': 'soon'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('max_time', res.data)
+
+    def test_unknown_ordering_rejected(self):
+        res = self.client.get(RECIPE_URL, {'ordering': 'title'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_order_by_time_ties_broken_by_id(self):
+        expected = sorted(
+            self.recipes, key=lambda recipe: (recipe.time_minutes, recipe.id)
+        )
+
+        self.assertEqual(
+            self._walk({'ordering': 'time_minutes'}),
+            [recipe.id for recipe in expected],
+        )
+
+    def test_order_by_price_descending_pages(self):
+        expected = sorted(
+            self.recipes, key=lambda recipe: (recipe.price, recipe.id),
+            reverse=True,
+        )
+
+        self.assertEqual(
+            self._walk({'ordering': '-price'}),
+            [recipe.id for recipe in expected],
+        )
+
+    def test_previous_cursor_returns_same_page(self):
+        first = self.client.get(
+            RECIPE_URL, {'ordering': 'time_minutes', 'page_size': 2}
+        )
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+
+        self.assertEqual(back.data['results'], first.data['results'])
+
+    def test_fast_path_matches_model_path(self):
+        params = {'ordering': 'time_minutes', 'max_time': 30}
+        with self.settings(RECIPE_LIST_FAST_PATH=True):
+            fast = self.client.get(RECIPE_URL, params).content
+        with self.settings(RECIPE_LIST_FAST_PATH=False):
+            slow = self.client.get(RECIPE_URL, params).content
+
+        self.assertEqual(fast, slow)
+
+    def test_tampered_cursor_not_found(self):
+        # a position without the id half of (price, id)
+        cursor = base64.b64encode(b'p=2.50').decode()
+
+        res = self.client.get(
+            RECIPE_URL, {'ordering': 'price', 'cursor': cursor}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class RecipeSearchTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+        self.soup = create_recipe(
+            user=self.user, title='Tomato soup',
+            description='A quick lunch',
+        )
+        self.curry = create_recipe(
+            user=self.user, title='Chickpea curry',
+            description='Slow cooked with tomato',
+        )
+        self.curry.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        self.pie = create_recipe(user=self.user, title='Apple pie')
+        self.pie.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Cinnamon')
+        )
+        other = create_user('other@example.com', 'testpass123')
+        create_recipe(user=other, title='Tomato salad')
+
+    def _search(self, text, **params):
+        res = self.client.get(RECIPE_URL, {'search': text, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res
+
+    def _ids(self, res):
+        return {item['id'] for item in res.data['results']}
+
+    def test_search_title_and_description(self):
+        res = self._search('tomato')
+
+        self.assertEqual(self._ids(res), {self.soup.id, self.curry.id})
+
+    def test_search_tag_and_ingredient_names(self):
+        self.assertEqual(self._ids(self._search('vegan')), {self.curry.id})
+        self.assertEqual(self._ids(self._search('cinnamon')), {self.pie.id})
+
+    def test_search_requires_every_term(self):
+        res = self._search('tomato curry')
+
+        self.assertEqual(self._ids(res), {self.curry.id})
+
+    def test_search_updates_after_write(self):
+        self.client.patch(
+            get_recipe_detail(self.pie.id), {'title': 'Tomato tart'},
+        )
+
+        self.assertIn(self.pie.id, self._ids(self._search('tomato')))
+
+    def test_search_paginated(self):
+        first = self._search('tomato', page_size=1)
+        second = self.client.get(first.data['next'])
+
+        self.assertEqual(len(first.data['results']), 1)
+        self.assertEqual(
+            self._ids(first) | self._ids(second),
+            {self.soup.id, self.curry.id},
+        )
+
+    @skipUnless(connection.vendor == 'postgresql', 'needs tsvector')
+    def test_search_ranked_by_weight(self):
+        # a title match (weight A) outranks a description match (C)
+        res = self._search('tomato')
+
+        ids = [item['id'] for item in res.data['results']]
+        self.assertEqual(ids, [self.soup.id, self.curry.id])
+
 
 class ImageUploadTests(TestCase):
 
@@ -424,8 +1629,25 @@ class ImageUploadTests(TestCase):
 
 
     def tearDown(self):
+        if self.recipe.image:
+            shutil.rmtree(
+                os.path.dirname(self.recipe.image.storage.path(
+                    variant_path(self.recipe.image.name, 'medium')
+                )),
+                ignore_errors=True,
+            )
         self.recipe.image.delete()
 
+    def upload(self, size=(10, 10)):
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            img = Image.new('RGB', size)
+            img.save(image_file, format='JPEG')
+            image_file.seek(0)
+            return self.client.post(
+                url, {'image': image_file}, format='multipart'
+            )
+
     def test_upload_image(self):
 
         url = image_upload_url(self.recipe.id)
@@ -448,3 +1670,79 @@ class ImageUploadTests(TestCase):
         res = self.client.post(url, payload, format='multipart')
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_upload_queues_processing(self):
+        with patch('recipe.images.image_worker.submit') as submit, \
+                self.captureOnCommitCallbacks(execute=True):
+            res = self.upload()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['image_status'], 'pending')
+        self.assertEqual(res.data['image_variants'], {})
+        submit.assert_called_once_with(self.recipe.id)
+
+    @override_settings(RECIPE_IMAGE_PROCESSING='sync')
+    def test_upload_renders_variants(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.upload(size=(2000, 1000))
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, 'ready')
+        for variant, (size, encoding) in VARIANTS.items():
+            path = self.recipe.image.storage.path(
+                variant_path(self.recipe.image.name, variant)
+            )
+            with Image.open(path) as img:
+                self.assertEqual(img.format, encoding)
+                self.assertEqual(max(img.size), size)
+
+        res = self.client.get(get_recipe_detail(self.recipe.id))
+        self.assertEqual(res.data['image_status'], 'ready')
+        self.assertEqual(set(res.data['image_variants']), set(VARIANTS))
+        self.assertTrue(
+            res.data['image_variants']['medium'].endswith('/medium.jpg')
+        )
+
+    @override_settings(RECIPE_IMAGE_PROCESSING='sync')
+    def test_reupload_deletes_old_variants(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.upload()
+        self.recipe.refresh_from_db()
+        old_image = self.recipe.image.name
+        storage = self.recipe.image.storage
+        self.addCleanup(storage.delete, old_image)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.upload()
+
+        self.recipe.refresh_from_db()
+        for variant in VARIANTS:
+            self.assertFalse(
+                storage.exists(variant_path(old_image, variant))
+            )
+            self.assertTrue(storage.exists(
+                variant_path(self.recipe.image.name, variant)
+            ))
+
+    def test_processing_failure_recorded(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            self.upload()
+
+        with patch(
+            'recipe.images.render_variants', side_effect=OSError('broken'),
+        ), self.assertLogs('recipe.images', level='ERROR'):
+            self.assertEqual(process_recipe_image(self.recipe.id), 'failed')
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, 'failed')
+
+    def test_command_processes_pending(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            self.upload()
+        out = StringIO()
+
+        call_command('process_recipe_images', stdout=out)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, 'ready')
+        self.assertIn('1 ready, 0 failed', out.getvalue())
+
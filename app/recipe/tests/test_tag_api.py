@@ -1,12 +1,17 @@
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from decimal import Decimal
+from unittest.mock import patch
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from core.benchmark import seed_user_recipes
 from core.models import Tag, Recipe
+from core.tests.helpers import QueryCountMixin, query_budget
 
 from recipe.serializers import TagSerializer
 
@@ -46,7 +51,7 @@ class PrivateTagsApiTests(TestCase):
         serializer = TagSerializer(allTags, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data,serializer.data)
+        self.assertEqual(res.data['results'],serializer.data)
 
     def test_tags_limited_to_user(self):
 
@@ -58,9 +63,9 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
-        self.assertEqual(res.data[0]['id'], tag.id)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
+        self.assertEqual(res.data['results'][0]['id'], tag.id)
 
     def test_update_tag(self):
         tag = Tag.objects.create(user=self.user, name='vegan')
@@ -73,6 +78,43 @@ class PrivateTagsApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(tag.name, payload['name'])
 
+    def test_update_tag_invalidates_cached_lists(self):
+        tag = Tag.objects.create(user=self.user, name='vegan')
+        self.client.get(TAGS_URL)
+
+        self.client.patch(get_detail_url(tag.id), {'name': 'paleo'})
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data['results'][0]['name'], 'paleo')
+
+    def test_rename_rolls_back_when_reindexing_fails(self):
+        tag = Tag.objects.create(user=self.user, name='vegan')
+        recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5,
+            price=Decimal('1.00'),
+        )
+        recipe.tags.add(tag)
+
+        with patch(
+            'recipe.views.update_search_vectors',
+            side_effect=RuntimeError('reindex failed'),
+        ), self.assertRaises(RuntimeError):
+            self.client.patch(get_detail_url(tag.id), {'name': 'paleo'})
+
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'vegan')
+        self.assertEqual(
+            Recipe.objects.get(id=recipe.id).updated_at, recipe.updated_at,
+        )
+
+    def test_rename_tag_to_existing_name_fails(self):
+        Tag.objects.create(user=self.user, name='vegan')
+        tag = Tag.objects.create(user=self.user, name='paleo')
+
+        res = self.client.patch(get_detail_url(tag.id), {'name': 'vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_delete_tag(self):
         tag = Tag.objects.create(user=self.user, name='vegan')
 
@@ -101,5 +143,92 @@ class PrivateTagsApiTests(TestCase):
         s1 = TagSerializer(tag1)
         s2 = TagSerializer(tag2)
 
-        self.assertIn(s1.data, res.data)
-        self.assertNotIn(s2.data, res.data)
\ No newline at end of file
+        self.assertIn(s1.data, res.data['results'])
+        self.assertNotIn(s2.data, res.data['results'])
+
+    def test_assigned_only_uses_exists_without_distinct(self):
+        item = Tag.objects.create(user=self.user, name='Used')
+        Tag.objects.create(user=self.user, name='Unused')
+        for title in ('First', 'Second'):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=title,
+                time_minutes=10,
+                price=Decimal('1.00'),
+            )
+            recipe.tags.add(item)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        names = [row['name'] for row in res.data['results']]
+        self.assertEqual(names, ['Used'])
+        sql = ctx.captured_queries[-1]['sql']
+        self.assertIn('EXISTS', sql)
+        self.assertNotIn('DISTINCT', sql)
+
+    def test_invalid_flag_is_rejected(self):
+        res = self.client.get(TAGS_URL, {'with_usage': 'often'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('with_usage', res.data)
+
+    def test_with_usage_counts_recipes(self):
+        used = Tag.objects.create(user=self.user, name='Used')
+        Tag.objects.create(user=self.user, name='Unused')
+        for title in ('First', 'Second'):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=title,
+                time_minutes=10,
+                price=Decimal('1.00'),
+            )
+            recipe.tags.add(used)
+
+        res = self.client.get(TAGS_URL, {'with_usage': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        counts = {
+            row['name']: row['recipe_count'] for row in res.data['results']
+        }
+        self.assertEqual(counts, {'Used': 2, 'Unused': 0})
+
+
+@query_budget('TagViewSet.list', 2, time_ms=250)
+@query_budget('TagViewSet.partial_update', 13)
+@query_budget('TagViewSet.destroy', 13)
+class TagQueryBudgetTests(QueryCountMixin, TestCase):
+    """Query budgets of the tag endpoints at 1, 10 and 100 recipes."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def populate(self, size):
+        seed_user_recipes(self.user, size, tags=5, ingredients=5)
+        self.tag = Tag.objects.filter(user=self.user).latest('id')
+
+    def test_list(self):
+        self.assertWithinBudget(
+            'TagViewSet.list',
+            lambda: self.client.get(TAGS_URL, {'with_usage': 1}),
+            self.populate,
+        )
+
+    def test_partial_update(self):
+        self.assertWithinBudget(
+            'TagViewSet.partial_update',
+            lambda: self.client.patch(
+                get_detail_url(self.tag.id),
+                {'name': f'Renamed {self.tag.id}'},
+            ),
+            self.populate,
+        )
+
+    def test_destroy(self):
+        self.assertWithinBudget(
+            'TagViewSet.destroy',
+            lambda: self.client.delete(get_detail_url(self.tag.id)),
+            self.populate,
+        )
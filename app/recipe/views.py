@@ -5,16 +5,103 @@ from drf_spectacular.utils import (
     OpenApiTypes,
 )
 
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import (
+    Count,
+    Exists,
+    OuterRef,
+    Prefetch,
+    Q,
+    Subquery,
+    prefetch_related_objects,
+)
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from rest_framework import viewsets, mixins
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework import status
 
 
-from core.models import Recipe, Tag, Ingredient
+from core.models import Recipe, RecipeTombstone, Tag, Ingredient
 from recipe import serializers
+from recipe.cache import list_cache, query_digest
+from recipe.export import EXPORT_FORMATS, export_recipes
+from recipe.images import delete_variants, image_worker
+from recipe.search import is_ranked, search_recipes, update_search_vectors
+from user.authentication import CachedTokenAuthentication
+
+NESTED_PREFETCHES = {
+    'tags': Prefetch('tags', queryset=Tag.objects.order_by('id')),
+    'ingredients': Prefetch(
+        'ingredients', queryset=Ingredient.objects.order_by('id')
+    ),
+}
+
+# list query parameter -> lookup on Recipe
+RANGE_FILTERS = {
+    'min_time': 'time_minutes__gte',
+    'max_time': 'time_minutes__lte',
+    'min_price': 'price__gte',
+    'max_price': 'price__lte',
+}
+
+# columns a serializer method field reads, for `only()` on sparse requests
+COMPUTED_FIELD_COLUMNS = {
+    'image_variants': ('image', 'image_status'),
+}
+
+
+def is_recipe_id(value):
+    # JSON true/false load as bools, which are ints to isinstance()
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+INVALID_ID = {
+    'status': status.HTTP_400_BAD_REQUEST,
+    'errors': {'id': ['A valid integer is required.']},
+}
+
+
+class CachedListMixin:
+    """Serve list responses from the per-user list cache."""
+
+    def get_recipes_version(self):
+        # the user's collection version, read from the database once
+        if not hasattr(self, '_recipes_version'):
+            self._recipes_version = get_user_model().objects.filter(
+                pk=self.request.user.pk
+            ).values_list('recipes_version', 'recipes_modified_at').get()
+        return self._recipes_version
+
+    def list(self, request, *args, **kwargs):
+        if not list_cache.enabled:
+            return super().list(request, *args, **kwargs)
+
+        # the key carries the version read before the query runs, so a
+        # write that lands meanwhile can't leave a stale entry current
+        key = list_cache.make_key(
+            request, self.basename, *self.get_recipes_version()
+        )
+        payload = list_cache.get(key)
+        if payload is not None:
+            return Response(payload)
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            list_cache.set(key, response.data)
+        return response
+
+    def data_changed(self):
+        # the user's recipes, tags or ingredients were written
+        self.request.user.bump_recipes_version()
 
 @extend_schema_view(
     list = extend_schema(
@@ -28,35 +115,301 @@ from recipe import serializers
                 'ingredients',
                 OpenApiTypes.STR,
                 description = 'Comma seperated list of ingredient IDs to filter'
+            ),
+            OpenApiParameter(
+                'match',
+                OpenApiTypes.STR, enum = ['any', 'all'],
+                description = 'Require any (default) or all of the given IDs'
+            ),
+            OpenApiParameter(
+                'min_time',
+                OpenApiTypes.INT,
+                description = 'Only recipes taking at least this many minutes'
+            ),
+            OpenApiParameter(
+                'max_time',
+                OpenApiTypes.INT,
+                description = 'Only recipes taking at most this many minutes'
+            ),
+            OpenApiParameter(
+                'min_price',
+                OpenApiTypes.DECIMAL,
+                description = 'Only recipes costing at least this much'
+            ),
+            OpenApiParameter(
+                'max_price',
+                OpenApiTypes.DECIMAL,
+                description = 'Only recipes costing at most this much'
+            ),
+            OpenApiParameter(
+                'ordering',
+                OpenApiTypes.STR,
+                enum = ['id', '-id', 'time_minutes', '-time_minutes',
+                        'price', '-price'],
+                description = 'Sort order, newest first (-id) by default'
+            ),
+            OpenApiParameter(
+                'search',
+                OpenApiTypes.STR,
+                description = 'Full-text search of titles, descriptions, '
+                              'tag and ingredient names, best match first'
+            ),
+            OpenApiParameter(
+                'fields',
+                OpenApiTypes.STR,
+                description = 'Comma seperated list of fields to return'
+            ),
+            OpenApiParameter(
+                'expand',
+                OpenApiTypes.STR,
+                description = 'Comma seperated list of relations to return '
+                              'as objects instead of IDs'
             )
         ]
+    ),
+    retrieve = extend_schema(
+        parameters = [
+            OpenApiParameter(
+                'fields',
+                OpenApiTypes.STR,
+                description = 'Comma seperated list of fields to return'
+            ),
+            OpenApiParameter(
+                'expand',
+                OpenApiTypes.STR,
+                description = 'Comma seperated list of relations to return '
+                              'as objects instead of IDs'
+            )
+        ]
+    ),
+    bulk = extend_schema(
+        parameters = [
+            OpenApiParameter(
+                'atomic',
+                OpenApiTypes.BOOL,
+                description = 'Apply all items or none (default true)'
+            )
+        ]
+    ),
+    changes = extend_schema(
+        parameters = [
+            OpenApiParameter(
+                'since',
+                OpenApiTypes.STR,
+                description = 'Cursor returned by the previous sync, '
+                              'omit for a full sync'
+            ),
+            OpenApiParameter(
+                'page_size',
+                OpenApiTypes.INT,
+                description = 'Maximum number of changed recipes to return'
+            )
+        ]
+    ),
+    export = extend_schema(
+        parameters = [
+            OpenApiParameter(
+                'export_format',
+                OpenApiTypes.STR, enum = list(EXPORT_FORMATS),
+                description = 'One JSON object per line (ndjson, default) '
+                              'or CSV'
+            )
+        ],
+        responses = {200: OpenApiTypes.BINARY}
     )
 )
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(CachedListMixin, viewsets.ModelViewSet):
 
     serializer_class = serializers.RecipeDetailSerializer
-    queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication]
+    queryset = Recipe.objects.defer('search_vector')
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    # retrieve() reads updated_at before get_object() validates the pk
+    lookup_value_regex = r'\d+'
+
+    def _get_sparse_fields(self):
+        # (fields, expand) requested by a read, (None, None) for full output
+        params = self.request.query_params
+        if self.action not in ('list', 'retrieve') or not (
+            'fields' in params or 'expand' in params
+        ):
+            return None, None
+
+        if self.action == 'list':
+            available = serializers.RecipeSerializer.Meta.fields
+        else:
+            available = self.serializer_class.Meta.fields
+        fields = available
+        if 'fields' in params:
+            fields = [name for name in params['fields'].split(',') if name]
+        expand = [name for name in params.get('expand', '').split(',') if name]
 
-    def _params_to_ints(self, qs):
-        return [int(str_id) for str_id in qs.split(',')]
+        unknown = set(fields) - set(available)
+        unknown.update(set(expand) - set(NESTED_PREFETCHES))
+        if unknown:
+            raise ValidationError(
+                {'fields': [f'Unknown fields: {", ".join(sorted(unknown))}']}
+            )
+        return fields, expand
+
+    def _get_prefetch_lookups(self):
+        # nested relations the serializer for this action will render
+        if self.action == 'destroy' or self.request.method == 'DELETE':
+            return []
+        fields, expand = self._get_sparse_fields()
+        if fields is None:
+            fields = self.get_serializer_class().Meta.fields
+            expand = fields
+        lookups = []
+        for name, prefetch in NESTED_PREFETCHES.items():
+            if name in expand:
+                lookups.append(prefetch)
+            elif name in fields:
+                # collapsed to a list of ids
+                model = Recipe._meta.get_field(name).related_model
+                lookups.append(Prefetch(
+                    name, queryset=model.objects.only('id').order_by('id'),
+                ))
+        return lookups
+
+    def _get_list_params(self):
+        # validated filters and ordering of a list request
+        if self.action != 'list':
+            return {}
+        params = serializers.RecipeListParamsSerializer(
+            data=self.request.query_params
+        )
+        params.is_valid(raise_exception=True)
+        return params.validated_data
+
+    def _use_fast_list(self):
+        return self.action == 'list' and settings.RECIPE_LIST_FAST_PATH \
+            and self._get_sparse_fields() == (None, None)
+
+    def _related_filter(self, field_name, ids, match_all):
+        # subquery on the M2M table, so matching rows are never multiplied
+        field = Recipe._meta.get_field(field_name)
+        recipe_column = field.m2m_column_name()
+        related_column = field.m2m_reverse_name()
+        links = field.remote_field.through.objects.filter(
+            **{f'{related_column}__in': ids}
+        ).order_by()
+        if match_all:
+            matching = links.values(recipe_column).annotate(
+                matched=Count(related_column, distinct=True)
+            ).filter(matched=len(set(ids))).values(recipe_column)
+            return Q(id__in=matching)
+        return Exists(links.filter(**{recipe_column: OuterRef('pk')}))
 
     def get_queryset(self):
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
+        params = self._get_list_params()
+        tag_ids = params.get('tags')
+        ingredients_ids = params.get('ingredients')
+        match_all = params.get('match') == 'all'
         queryset = self.queryset
-        if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
-        if ingredients:
-            ingredients_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredients_ids)
-        return queryset.filter(user=self.request.user).order_by('-id')
+        if tag_ids:
+            queryset = queryset.filter(
+                self._related_filter('tags', tag_ids, match_all)
+            )
+        if ingredients_ids:
+            queryset = queryset.filter(
+                self._related_filter('ingredients', ingredients_ids, match_all)
+            )
+        queryset = queryset.filter(user=self.request.user).order_by('-id')
+        queryset = queryset.filter(**{
+            lookup: params[name]
+            for name, lookup in RANGE_FILTERS.items() if name in params
+        })
+        search = self.request.query_params.get('search', '').strip()
+        if search and self.action == 'list':
+            queryset = search_recipes(queryset, search)
+        if self._use_fast_list():
+            value_fields = serializers.RecipeValuesSerializer.Meta.value_fields
+            if 'search_rank' in queryset.query.annotations:
+                # the cursor reads its position from the row
+                value_fields = value_fields + ['search_rank']
+            return queryset.values(*value_fields)
+        fields, expand = self._get_sparse_fields()
+        if fields is not None:
+            concrete = {
+                field.name for field in Recipe._meta.concrete_fields
+            }
+            columns = {'id'}
+            for name in fields:
+                if name in concrete:
+                    columns.add(name)
+                columns.update(COMPUTED_FIELD_COLUMNS.get(name, ()))
+            queryset = queryset.only(*columns)
+        return queryset.prefetch_related(*self._get_prefetch_lookups())
+
+    def get_pagination_ordering(self):
+        # (column, id) for the paginator; None keeps newest first
+        ordering = self._get_list_params().get('ordering')
+        if ordering:
+            if ordering.lstrip('-') == 'id':
+                return (ordering,)
+            direction = '-' if ordering.startswith('-') else ''
+            return (ordering, f'{direction}id')
+        # best matches first when the search is ranked
+        if self.request.query_params.get('search', '').strip() and \
+                is_ranked(self.queryset.db):
+            return ('-search_rank', '-id')
+        return None
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        fields, expand = self._get_sparse_fields()
+        if fields is not None:
+            context.update(fields=fields, expand=expand)
+        return context
+
+    def _conditional_response(self, request, etag, last_modified):
+        # 304 when the client's copy is current; the rows are never loaded
+        etag = f'"{etag}-{request.accepted_renderer.format}"'
+        # HTTP dates have whole seconds, so compare in whole seconds
+        last_modified = int(last_modified.timestamp())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        return etag, http_date(last_modified), response
+
+    def list(self, request, *args, **kwargs):
+        # the ETag and the cached body share this version
+        version, modified_at = self.get_recipes_version()
+        etag, last_modified, response = self._conditional_response(
+            request,
+            f'{request.user.pk}.{version}.{query_digest(request)}',
+            modified_at,
+        )
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+            response['ETag'] = etag
+            response['Last-Modified'] = last_modified
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        updated_at = self.get_queryset().filter(
+            pk=kwargs['pk']
+        ).values_list('updated_at', flat=True).first()
+        if updated_at is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        etag, last_modified, response = self._conditional_response(
+            request,
+            f'{kwargs["pk"]}.{int(updated_at.timestamp() * 1e6)}',
+            updated_at,
+        )
+        if response is None:
+            response = super().retrieve(request, *args, **kwargs)
+            response['ETag'] = etag
+            response['Last-Modified'] = last_modified
+        return response
 
     def get_serializer_class(self):
         # return the serializer class for request !important
-        if self.action == 'list':
+        if self._use_fast_list():
+            return serializers.RecipeValuesSerializer
+        elif self.action == 'list':
             return serializers.RecipeSerializer
         elif self.action == 'upload_image':
             return serializers.RecipeImageSerializer
@@ -65,6 +418,17 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+        self.data_changed()
+
+    def perform_update(self, serializer):
+        serializer.save()
+        self.data_changed()
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            RecipeTombstone.record(self.request.user, [instance.id])
+            instance.delete()
+        self.data_changed()
 
     @action(methods=['POST'], detail=True, url_path='upload-image') #FindOut: what is detail true
     def upload_image(self, request, pk=None):
@@ -72,47 +436,335 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(recipe, data=request.data)
 
         if serializer.is_valid():
-            serializer.save()
+            replaced = recipe.image.name
+            # variants are rendered by the image worker after commit
+            serializer.save(image_status='pending')
+            self.data_changed()
+            if replaced and replaced != recipe.image.name:
+                delete_variants(replaced, recipe.image.storage)
+            image_worker.enqueue(recipe.id)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def _parse_change_cursor(self, cursor):
+        # 'seq' after a complete sync, 'seq.id' partway through one seq
+        seq, partial, last_id = cursor.partition('.')
+        try:
+            seq = int(seq or 0)
+            last_id = int(last_id) if partial else None
+        except ValueError:
+            seq = -1
+        if seq < 0 or last_id is not None and last_id < 0:
+            raise ValidationError({'since': ['Invalid cursor.']})
+        return seq, last_id
+
+    @action(methods=['GET'], detail=False, url_path='changes')
+    def changes(self, request):
+        # recipes written and ids deleted after the `since` cursor
+        since, since_id = self._parse_change_cursor(
+            request.query_params.get('since', '')
+        )
+        limit = self.paginator.get_page_size(request)
+        user = request.user
+
+        # number rows a crashed or non-API write left unnumbered
+        if Recipe.objects.filter(
+            user=user, change_seq__isnull=True
+        ).exists() or RecipeTombstone.objects.filter(
+            user=user, change_seq__isnull=True
+        ).exists():
+            version = user.bump_recipes_version()
+        else:
+            version = get_user_model().objects.filter(
+                pk=user.pk
+            ).values_list('recipes_version', flat=True).get()
+
+        after = Q(change_seq__gt=since)
+        if since_id is not None:
+            after |= Q(change_seq=since, id__gt=since_id)
+        recipes = list(self.get_queryset().filter(
+            after, change_seq__lte=version,
+        ).order_by('change_seq', 'id')[:limit + 1])
+        has_more = len(recipes) > limit
+        recipes = recipes[:limit]
+        if has_more:
+            upper = recipes[-1].change_seq
+            cursor = f'{upper}.{recipes[-1].id}'
+        else:
+            upper = version
+            cursor = str(version)
+
+        deleted = []
+        if since:
+            # a full sync has nothing to delete
+            deleted = list(RecipeTombstone.objects.filter(
+                user=user, change_seq__gt=since, change_seq__lte=upper,
+            ).order_by('change_seq', 'id').values_list(
+                'recipe_id', flat=True,
+            ))
+
+        return Response({
+            'results': self.get_serializer(recipes, many=True).data,
+            'deleted': deleted,
+            'cursor': cursor,
+            'has_more': has_more,
+        })
+
+    @action(methods=['GET'], detail=False, url_path='export')
+    def export(self, request):
+        # every recipe of the user, streamed oldest first
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError({'export_format': [
+                f'Choose one of: {", ".join(EXPORT_FORMATS)}.'
+            ]})
+        content_type, filename = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(
+            export_recipes(
+                Recipe.objects.filter(user=request.user).order_by('id'),
+                export_format,
+                self.get_serializer_context(),
+                settings.RECIPE_EXPORT_CHUNK_SIZE,
+            ),
+            content_type=content_type,
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        # let nginx pass chunks on as they come instead of buffering
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    @action(methods=['POST', 'PATCH', 'DELETE'], detail=False, url_path='bulk')
+    def bulk(self, request):
+        # create, update or delete many recipes in one request
+        if not isinstance(request.data, list):
+            return Response(
+                {'detail': 'Expected a list of items.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        params = serializers.RecipeBulkParamsSerializer(
+            data=request.query_params
+        )
+        params.is_valid(raise_exception=True)
+        atomic = params.validated_data['atomic']
+        handler, success_status = {
+            'POST': (self._bulk_create, status.HTTP_201_CREATED),
+            'PATCH': (self._bulk_update, status.HTTP_200_OK),
+            'DELETE': (self._bulk_destroy, status.HTTP_200_OK),
+        }[request.method]
+        results = handler(request.data, atomic)
+
+        if all(result['status'] < 400 for result in results):
+            response_status = success_status
+        elif atomic:
+            response_status = status.HTTP_400_BAD_REQUEST
+        else:
+            response_status = status.HTTP_207_MULTI_STATUS
+        return Response({'results': results}, status=response_status)
+
+    def _bulk_rejected(self, errors):
+        # atomic batch with failures: the valid items were not applied either
+        return [
+            error or {'status': status.HTTP_424_FAILED_DEPENDENCY}
+            for error in errors
+        ]
+
+    def _bulk_create(self, items, atomic):
+        serializer = self.get_serializer(data=items, many=True)
+        if serializer.is_valid():
+            errors = [None] * len(items)
+        else:
+            errors = [
+                {'status': status.HTTP_400_BAD_REQUEST, 'errors': error}
+                if error else None
+                for error in serializer.errors
+            ]
+            if atomic:
+                return self._bulk_rejected(errors)
+            serializer = self.get_serializer(
+                data=[item for item, error in zip(items, errors) if not error],
+                many=True,
+            )
+            serializer.is_valid(raise_exception=True)
+
+        self.perform_create(serializer)
+        prefetch_related_objects(
+            serializer.instance, *NESTED_PREFETCHES.values()
+        )
+        created = iter(serializer.data)
+        return [
+            error or {'status': status.HTTP_201_CREATED, 'data': next(created)}
+            for error in errors
+        ]
+
+    def _bulk_update(self, items, atomic):
+        ids = [
+            item.get('id') for item in items
+            if isinstance(item, dict) and is_recipe_id(item.get('id'))
+        ]
+        instances = self.get_queryset().in_bulk(ids)
+
+        errors = []
+        pending = []
+        for item in items:
+            instance = None
+            if isinstance(item, dict):
+                if 'id' in item and not is_recipe_id(item['id']):
+                    errors.append(dict(INVALID_ID))
+                    continue
+                instance = instances.get(item.get('id'))
+            if instance is None:
+                errors.append({
+                    'status': status.HTTP_404_NOT_FOUND,
+                    'errors': {'detail': 'Not found.'},
+                })
+                continue
+            serializer = self.get_serializer(instance, data=item, partial=True)
+            if serializer.is_valid():
+                errors.append(None)
+                pending.append(serializer)
+            else:
+                errors.append({
+                    'status': status.HTTP_400_BAD_REQUEST,
+                    'errors': serializer.errors,
+                })
+
+        if atomic and any(errors):
+            return self._bulk_rejected(errors)
+
+        with transaction.atomic():
+            for serializer in pending:
+                self.perform_update(serializer)
+        updated = [serializer.instance for serializer in pending]
+        for instance in updated:
+            instance._prefetched_objects_cache = {}
+        prefetch_related_objects(updated, *NESTED_PREFETCHES.values())
+
+        serialized = iter(pending)
+        return [
+            error or {
+                'status': status.HTTP_200_OK,
+                'data': next(serialized).data,
+            }
+            for error in errors
+        ]
+
+    def _bulk_destroy(self, ids, atomic):
+        valid_ids = [pk for pk in ids if is_recipe_id(pk)]
+        existing = set(
+            self.get_queryset().filter(
+                id__in=valid_ids
+            ).values_list('id', flat=True)
+        )
+        errors = []
+        for pk in ids:
+            if not is_recipe_id(pk):
+                errors.append(dict(INVALID_ID, id=pk))
+            elif pk not in existing:
+                errors.append({
+                    'id': pk,
+                    'status': status.HTTP_404_NOT_FOUND,
+                    'errors': {'detail': 'Not found.'},
+                })
+            else:
+                errors.append(None)
+        if atomic and any(errors):
+            return self._bulk_rejected(errors)
+
+        with transaction.atomic():
+            RecipeTombstone.record(self.request.user, existing)
+            self.get_queryset().filter(id__in=existing).delete()
+        self.data_changed()
+        return [
+            error or {'id': pk, 'status': status.HTTP_204_NO_CONTENT}
+            for pk, error in zip(ids, errors)
+        ]
+
 @extend_schema_view(
     list = extend_schema(
         parameters = [
             OpenApiParameter(
                 'assigned_only',
-                OpenApiTypes.INT, enum = [0, 1],
+                OpenApiTypes.BOOL,
                 description = 'Filter by items assigned to recipes'
+            ),
+            OpenApiParameter(
+                'with_usage',
+                OpenApiTypes.BOOL,
+                description = 'Include the number of recipes using each item'
             )
         ]
     )
 )
 class BaseRecipeAttrSet(
+    CachedListMixin,
     mixins.DestroyModelMixin,
     mixins.UpdateModelMixin,
     mixins.ListModelMixin,
     viewsets.GenericViewSet
 ):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
 
-    def get_queryset(self):
-        assigned_only = bool(
-            int(self.request.query_params.get('assigned_only',0))
+    def _get_params(self):
+        # validated assigned_only and with_usage flags of the request
+        params = serializers.RecipeAttrParamsSerializer(
+            data=self.request.query_params
         )
+        params.is_valid(raise_exception=True)
+        return params.validated_data
+
+    def _with_usage(self):
+        return self._get_params()['with_usage']
+
+    def get_queryset(self):
+        assigned_only = self._get_params()['assigned_only']
         queryset = self.queryset
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull = False)
+            queryset = queryset.filter(
+                Exists(serializers.recipe_links(self.recipe_field))
+            )
+        if self._with_usage():
+            usage = serializers.recipe_links(self.recipe_field).annotate(
+                count=Count('*')
+            ).values('count')
+            queryset = queryset.annotate(
+                recipe_count=Coalesce(Subquery(usage), 0)
+            )
+
+        return queryset.filter(user=self.request.user).order_by('-id')
+
+    def get_serializer_class(self):
+        if self._with_usage():
+            return self.usage_serializer_class
+        return self.serializer_class
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+            # nested names shown on the recipes changed too
+            recipes = serializer.instance.recipe_set
+            recipes.update(updated_at=timezone.now(), change_seq=None)
+            update_search_vectors(list(recipes.values_list('id', flat=True)))
+            self.data_changed()
 
-        return queryset.filter(user=self.request.user).order_by('-id').distinct()
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            recipes = instance.recipe_set
+            recipe_ids = list(recipes.values_list('id', flat=True))
+            recipes.update(updated_at=timezone.now(), change_seq=None)
+            instance.delete()
+            update_search_vectors(recipe_ids)
+            self.data_changed()
 
 #understand meaning of these Base class that are being extended
 class TagViewSet(BaseRecipeAttrSet):
 
     serializer_class = serializers.TagSerializer
+    usage_serializer_class = serializers.TagUsageSerializer
     queryset = Tag.objects.all()
+    recipe_field = 'tags'
 
 
 
@@ -120,5 +772,7 @@ class TagViewSet(BaseRecipeAttrSet):
 class IngredientViewSet(BaseRecipeAttrSet):
     # manage ingredients in the database
     serializer_class = serializers.IngredientSerializer
+    usage_serializer_class = serializers.IngredientUsageSerializer
     queryset = Ingredient.objects.all()
+    recipe_field = 'ingredients'
 
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class UserConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'user'
+
+    def ready(self):
+        from core.metrics import registry
+        from user import signals  # noqa: F401
+        from user.authentication import token_cache
+
+        registry.register_stats(
+            'auth_token_cache', token_cache.stats, ['hits', 'misses', 'size'],
+        )
@@ -0,0 +1,157 @@
+"""
+Authentication for the API
+
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+
+class TokenCache:
+    """Token key -> (user, token) lookups kept in a bounded per-process LRU.
+
+    AUTH_TOKEN_CACHE_ALIAS must name a Django cache shared by every worker;
+    without one nothing is cached. Entries are stamped with a per-user
+    generation kept in the shared cache, and every hit compares the stamp
+    with the current generation. Saving or deleting the user or one of its
+    tokens bumps the generation, so all workers drop their copies at once.
+    Entries also expire after AUTH_TOKEN_CACHE_TTL seconds, which bounds
+    how long a write that skips model signals, like a queryset update(),
+    goes unseen.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def shared(self):
+        alias = settings.AUTH_TOKEN_CACHE_ALIAS
+        return caches[alias] if alias else None
+
+    def _shared_key(self, key):
+        return f'auth-token:{key}'
+
+    def _generation_key(self, user_id):
+        return f'auth-user:{user_id}:generation'
+
+    def _new_generation(self):
+        # never reuse a generation if the key itself was evicted
+        return time.time_ns()
+
+    def generation(self, user_id):
+        key = self._generation_key(user_id)
+        generation = self.shared.get(key)
+        if generation is None:
+            self.shared.add(key, self._new_generation(), None)
+            generation = self.shared.get(key)
+        return generation
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key):
+        if self.shared is None:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                entry = entry[1]
+            else:
+                self._entries.pop(key, None)
+                entry = None
+
+        local = entry is not None
+        if not local:
+            entry = self.shared.get(self._shared_key(key))
+        if entry is not None:
+            generation, user, token = entry
+            if generation != self.generation(user.pk):
+                entry = None
+                with self._lock:
+                    self._entries.pop(key, None)
+        self._count(entry is not None)
+        if entry is None:
+            return None
+        if not local:
+            self._store(key, entry)
+        return entry[1], entry[2]
+
+    def _store(self, key, entry):
+        expires = time.monotonic() + settings.AUTH_TOKEN_CACHE_TTL
+        with self._lock:
+            self._entries[key] = (expires, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.AUTH_TOKEN_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def set(self, key, value):
+        if self.shared is None:
+            return
+        user, token = value
+        entry = (self.generation(user.pk), user, token)
+        self._store(key, entry)
+        self.shared.set(
+            self._shared_key(key), entry, settings.AUTH_TOKEN_CACHE_TTL
+        )
+
+    def invalidate_user(self, user_id):
+        """Make every cached lookup of the user stale, in every worker."""
+        if self.shared is not None:
+            self.shared.set(
+                self._generation_key(user_id), self._new_generation(), None
+            )
+        with self._lock:
+            for key in [
+                key for key, (_, (_, user, _)) in self._entries.items()
+                if user.pk == user_id
+            ]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that skips the token query on a cache hit."""
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, (user, token))
+            return user, token
+
+        user, token = cached
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        # each request gets its own instance to modify
+        return copy.copy(user), token
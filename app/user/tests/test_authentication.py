@@ -0,0 +1,141 @@
+"""
+Tests for the cached token authentication
+
+"""
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import token_cache
+
+ME_URL = reverse('user:me')
+
+
+@override_settings(AUTH_TOKEN_CACHE_ALIAS='default')
+class CachedTokenAuthenticationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            name='Test Name',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_second_request_skips_token_query(self):
+        self.client.get(ME_URL)
+        hits = token_cache.stats()['hits']
+
+        # only the profile itself is read
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+        self.assertEqual(token_cache.stats()['hits'], hits + 1)
+
+    def test_deleted_token_is_rejected(self):
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_drops_cached_user(self):
+        self.client.get(ME_URL)
+        self.client.patch(ME_URL, {'password': 'newpassword123'})
+
+        with self.assertNumQueries(2):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_change_in_another_worker_drops_local_copy(self):
+        self.client.get(ME_URL)
+        local_entries = token_cache._entries.copy()
+        self.user.is_active = False
+        self.user.save()
+        # this worker still holds its copy; only the shared cache changed
+        token_cache._entries.update(local_entries)
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_is_read_from_database(self):
+        self.client.get(ME_URL)
+        get_user_model().objects.filter(pk=self.user.pk).update(name='New')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'New')
+
+    def test_profile_of_deactivated_user_is_rejected(self):
+        self.client.get(ME_URL)
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            is_active=False,
+        )
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(AUTH_TOKEN_CACHE_ALIAS=None)
+    def test_nothing_cached_without_shared_cache(self):
+        self.client.get(ME_URL)
+
+        self.assertEqual(token_cache.stats()['size'], 0)
+        self.assertIsNone(token_cache.get(self.token.key))
+
+    @override_settings(AUTH_TOKEN_CACHE_SIZE=1)
+    def test_cache_is_bounded(self):
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='testpass123',
+        )
+        other_token = Token.objects.create(user=other)
+        self.client.get(ME_URL)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {other_token.key}')
+        self.client.get(ME_URL)
+
+        self.assertEqual(token_cache.stats()['size'], 1)
+        # evicted locally; the shared cache still has it
+        self.assertNotIn(self.token.key, token_cache._entries)
+
+    def test_entries_expire(self):
+        self.client.get(ME_URL)
+
+        # both the local and the shared entry run out
+        with patch('time.monotonic', return_value=10 ** 9), \
+                patch('time.time', return_value=10 ** 12):
+            self.assertIsNone(token_cache.get(self.token.key))
+
+    def test_shared_cache_fills_local_cache(self):
+        self.client.get(ME_URL)
+        token_cache.clear()
+
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        cache.delete(f'auth-token:{self.token.key}')
@@ -5,6 +5,9 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core.benchmark import seed_user_recipes
+from core.tests.helpers import QueryCountMixin, query_budget
+
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
 ME_URL = reverse('user:me')
@@ -135,4 +138,60 @@ class PrivateUserApiTests(TestCase):
         self.user.refresh_from_db()
         self.assertEqual(self.user.name, payload['name'])
         self.assertTrue(self.user.check_password(payload['password']))
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
\ No newline at end of file
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+@query_budget('CreateUserView.post', 2)
+@query_budget('CreateTokenView.post', 5)
+@query_budget('ManageUserView.get', 1)
+@query_budget('ManageUserView.patch', 2)
+class UserQueryBudgetTests(QueryCountMixin, TestCase):
+    """Query budgets of the user endpoints at 1, 10 and 100 recipes."""
+
+    def setUp(self):
+        self.user = create_user(
+            email='test@example.com',
+            password='testpass123',
+            name='Test Name',
+        )
+        self.client = APIClient()
+
+    def populate(self, size):
+        seed_user_recipes(self.user, size, tags=5, ingredients=5)
+
+    def test_create_user(self):
+        emails = (f'new{i}@example.com' for i in range(3))
+        self.assertWithinBudget(
+            'CreateUserView.post',
+            lambda: self.client.post(CREATE_USER_URL, {
+                'email': next(emails),
+                'password': 'testpass123',
+                'name': 'New',
+            }),
+            self.populate,
+        )
+
+    def test_token(self):
+        self.assertWithinBudget(
+            'CreateTokenView.post',
+            lambda: self.client.post(TOKEN_URL, {
+                'email': 'test@example.com', 'password': 'testpass123',
+            }),
+            self.populate,
+        )
+
+    def test_retrieve_profile(self):
+        self.client.force_authenticate(user=self.user)
+        self.assertWithinBudget(
+            'ManageUserView.get',
+            lambda: self.client.get(ME_URL),
+            self.populate,
+        )
+
+    def test_update_profile(self):
+        self.client.force_authenticate(user=self.user)
+        self.assertWithinBudget(
+            'ManageUserView.patch',
+            lambda: self.client.patch(ME_URL, {'name': 'Renamed'}),
+            self.populate,
+        )
@@ -0,0 +1,24 @@
+server {
+
+    listen ${LISTEN_PORT};
+
+    # Recipe image variants never change once written: their paths embed
+    # the uuid of the upload they were made from.
+    location /static/media/uploads/recipe/variants/ {
+        alias /vol/static/media/uploads/recipe/variants/;
+        add_header Cache-Control "public, max-age=31536000, immutable";
+        access_log off;
+    }
+
+    location /static {
+        alias /vol/static;
+    }
+
+    location / {
+        proxy_pass            http://${APP_HOST}:${APP_PORT};
+        proxy_set_header      Host $host;
+        proxy_set_header      X-Forwarded-For $proxy_add_x_forwarded_for;
+        proxy_set_header      X-Forwarded-Proto $scheme;
+        client_max_body_size  10M;
+    }
+}
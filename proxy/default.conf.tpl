@@ -2,13 +2,21 @@ server {
 
     listen ${LISTEN_PORT};
 
-    locatin /static {
-        alias /vol/static
+    # Recipe image variants never change once written: their paths embed
+    # the uuid of the upload they were made from.
+    location /static/media/uploads/recipe/variants/ {
+        alias /vol/static/media/uploads/recipe/variants/;
+        add_header Cache-Control "public, max-age=31536000, immutable";
+        access_log off;
+    }
+
+    location /static {
+        alias /vol/static;
     }
 
     location / {
         uwsgi_pass            ${APP_HOST}:${APP_PORT};
         include               /etc/nginx/uwsgi_params;
-        client_max_body_size  10M
+        client_max_body_size  10M;
     }
-}
\ No newline at end of file
+}
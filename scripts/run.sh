@@ -2,8 +2,20 @@
 
 set -e
 
-python manage.py wait_for_db
+python manage.py wait_for_db --warm "${DB_WARM_CONNECTIONS:-0}"
 python manage.py collectstatic --noinput
 python manage.py migrate
+# render images whose queued job was lost when the last server stopped
+python manage.py process_recipe_images
 
-uwsgi --socket :9000 --workers 4 --master --enable-threads --module app.wsgi
\ No newline at end of file
+# workers drop metrics snapshots here for the /metrics/ endpoint to merge
+export METRICS_DIR="${METRICS_DIR:-/tmp/app-metrics}"
+rm -rf "$METRICS_DIR"
+mkdir -p "$METRICS_DIR"
+
+if [ "${SERVER_MODE:-wsgi}" = "asgi" ]; then
+    uvicorn app.asgi:application --host 0.0.0.0 --port 9000 \
+        --workers "${ASGI_WORKERS:-4}" --no-access-log
+else
+    uwsgi --socket :9000 --workers 4 --master --enable-threads --module app.wsgi
+fi